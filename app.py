@@ -1,19 +1,45 @@
 import streamlit as st
-import cv2
-import mediapipe as mp
 import time
-import joblib
-import numpy as np
-import os
 import urllib.parse
-from PIL import Image
-
-# Load model
-clf = joblib.load("model/hand_cricket1.pkl")
-
-# MediaPipe setup
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
+from gesture_vote import GestureVoter
+from game_engine import Match, PLAYER, BOT, END, WIN, LOSE, TIE
+from bot_policy import AdaptiveBot
+from assets import get_assets
+from model_registry import live_model
+from inference_service import inference_service
+from perf import get_monitor, format_table
+from warmup import warm_up, INFERENCE as PREWARM_INFERENCE
+
+# Heavy resources are process-wide singletons created on first use, not on every rerun:
+# - live_model(MODEL_DIR): the model, shared with the feedback page and swapped in between
+#   turns when a new version is published
+# - inference_service(MODEL_DIR): hand detection in a process pool shared by every session,
+#   with classification batched across them
+# - get_assets(): bot hands and overlays, decoded, resized and encoded once
+# None of them is needed for the first paint; warm_up() builds the model and assets in the
+# background after it (the detector pool only with HANDCRICKET_PREWARM_INFERENCE=1).
+MODEL_DIR = "model"
+
+# Per-stage latency for every session in this process (dumped to logs/perf_game.json)
+perf = get_monitor("game")
+# Detection workers and batched classification, shared with the feedback page (logs/perf_inference.json)
+inference_perf = get_monitor("inference")
+
+
+def diagnostics():
+    return "\n\n".join(format_table(m.snapshot()) for m in (perf, inference_perf))
+
+
+# Turn timing: countdown, then classify every frame until the vote is confident or the window closes
+COUNTDOWN_SECONDS = 3
+CAPTURE_WINDOW_SECONDS = 1.5
+VOTE_MIN_CONFIDENCE = 0.6
+VOTE_MIN_STABLE_FRAMES = 3
+
+# Webcam preview sent to the browser
+PREVIEW_FPS = 15
+PREVIEW_WIDTH = 480
+PREVIEW_JPEG_QUALITY = 70
 
 # Page Config
 st.set_page_config(page_title="Hand Cricket ML", page_icon="🏏", layout="wide")
@@ -203,35 +229,25 @@ def show_game_rules():
     # Hand sign images
     st.markdown("### :orange[:material/hand_gesture:] Hand Signs (1-10)")
     cols = st.columns(3)  # 3 rows of 4
-    img_files = sorted(
-        [f for f in os.listdir("bot_hands") if f.endswith(".png")],
-        key=lambda x: int(x.split(".")[0])
-    )
-    for idx, img in enumerate(img_files):
+    for idx, (num, img) in enumerate(get_assets().hand_signs()):
         with cols[idx % 3]:
-            st.image(f"bot_hands/{img}", caption=img.split(".")[0], use_container_width=True)
+            st.image(img, caption=str(num), use_container_width=True)
 
 
 # Dialog with overlay, score, and share buttons
 @st.dialog("Game Result")
 def share_modal(result_type, player_score, bot_score):
-    # Map result to overlay image path and message text
-    overlay_images = {
-        "win": "overlays/win.png",
-        "lose": "overlays/lost.png",
-        "tie": "overlays/tied.png"
-    }
-
+    # Map result to message text (overlay images come from the asset cache, keyed the same way)
     result_messages = {
         "win": "🏆 MATCH SEALED! VICTORY IS YOURS!",
         "lose": "😞 ALL OUT! BOT TAKES IT!",
         "tie": "🤝 It's a Tie! Well played!"
     }
 
-    # Load overlay image (handle file errors gracefully)
+    # Load overlay image (handle missing files gracefully)
     try:
-        overlay_img = Image.open(overlay_images.get(result_type, "overlays/tie.png"))
-    except Exception as e:
+        overlay_img = get_assets().overlay(result_type)
+    except KeyError as e:
         st.error(f"Error loading overlay image: {e}")
         overlay_img = None
 
@@ -282,79 +298,77 @@ def share_modal(result_type, player_score, bot_score):
 
 
 
-# Prediction function
-def predict(frame):
-    with mp_hands.Hands(static_image_mode=False, max_num_hands=1) as hands:
-        results = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        if results.multi_hand_landmarks:
-            landmarks = results.multi_hand_landmarks[0]
-            mp_drawing.draw_landmarks(frame, landmarks, mp_hands.HAND_CONNECTIONS)
-            data = np.array([[lm.x, lm.y, lm.z] for lm in landmarks.landmark]).flatten().reshape(1, -1)
-            return clf.predict(data)[0]
-    return None
-# Game Logic
+# Inference session: one per game session (its hand tracker lives in a worker process)
+def get_inference():
+    session = st.session_state.get("inference")
+    if session is None or session.closed:
+        session = inference_service(MODEL_DIR).open_session()
+        st.session_state.inference = session
+    return session
+
+def close_inference():
+    session = st.session_state.pop("inference", None)
+    if session is not None:
+        session.close()
+
+# Webcam reader thread: one per session, always holds the newest frame.
+# Released with the session (e.g. a closed tab) if the game never reaches close_camera().
+def get_camera():
+    camera = st.session_state.get("camera")
+    if camera is None or not camera.running:
+        from capture import CameraStream
+        camera = CameraStream(0).start()
+        st.session_state.camera = camera
+    return camera
+
+def close_camera():
+    camera = st.session_state.pop("camera", None)
+    if camera is not None:
+        camera.stop()
+
+# Prediction function: class probabilities for the hand in the frame (None if no hand)
+def predict_proba(frame, clf):
+    with perf.stage("infer"):
+        result = get_inference().infer(frame, clf)
+    if result is None:
+        perf.count("shed")
+        return None
+    if result.proba is None:
+        perf.count("undetected")
+    return result.proba
+# Game Logic: rules live in game_engine.Match; this only renders what a ball did
 def play_turn(player_num, bot_num):
-    # bot_num = np.random.randint(1, 11)
-    # bot_hand_image = Image.open(f"bot_hands/{bot_num}.png")
-    # bot_image_placeholder.image(bot_hand_image)
-    st.session_state.last_player_num = player_num
-    st.session_state.last_bot_num = bot_num
-
-    if st.session_state.batting == "player":
-        if player_num == bot_num:
-            st.session_state.out = True
-            # st.warning(f"🏏 OUT! Final Score: {st.session_state.player_score}")
-            # st.session_state.batting = "bot" if st.session_state.batting == "player" else "end"
+    match = st.session_state.match
+    ball = match.play_ball(player_num, bot_num)
+
+    if match.batting == PLAYER:
+        if ball.out:
             show_result_screen("🏏 PLAYER OUT!")
             time.sleep(2.5)
             remove_overlay()
-        else:
-            st.session_state.player_score += player_num
-    else:
-        if player_num == bot_num:
-            st.session_state.out = True
-            st.session_state.batting = "end"
-            if st.session_state.player_score == st.session_state.bot_score:
-                # st.warning("TIE TIE !!")
-                overlay_image = Image.open(f"overlays/tied.png")
-                player_video_placeholder.image(overlay_image)
-                show_result_screen("MATCH TIED!")
-                time.sleep(2.5)
-                remove_overlay()
-                share_modal("tie", st.session_state.player_score, st.session_state.bot_score)
-            else:
-                # st.warning("Bot Out! You Win!")
-                overlay_image = Image.open(f"overlays/win.png")
-                player_video_placeholder.image(overlay_image)
-                show_result_screen("MATCH SEALED! VICTORY IS YOURS!")
-                time.sleep(2.5)
-                remove_overlay()
-                share_modal("win", st.session_state.player_score, st.session_state.bot_score)
-        else:
-            st.session_state.bot_score += bot_num
-
-        if st.session_state.player_score < st.session_state.bot_score:
-            st.session_state.out = True
-            st.session_state.batting = "end"
-            # st.warning("Bot Wins! You lost!")
-            overlay_image = Image.open(f"overlays/lost.png")
-            player_video_placeholder.image(overlay_image)
-            show_result_screen("ALL OUT! BOT TAKES IT!")
-            time.sleep(2.5)
-            remove_overlay()
-            share_modal("lose", st.session_state.player_score, st.session_state.bot_score)
+    elif ball.result is not None:
+        message = {
+            TIE: "MATCH TIED!",
+            WIN: "MATCH SEALED! VICTORY IS YOURS!",
+            LOSE: "ALL OUT! BOT TAKES IT!",
+        }[ball.result]
+        player_video_placeholder.image(get_assets().overlay(ball.result))
+        show_result_screen(message)
+        time.sleep(2.5)
+        remove_overlay()
+        share_modal(ball.result, match.player_score, match.bot_score)
 
 def update_score():
-    if st.session_state.out and st.session_state.batting == "player":
-        player_score_placeholder.metric("Total Runs", value=f"{st.session_state.player_score} Runs",border=True)
-        st.session_state.batting = "bot"
+    match = st.session_state.match
+    if match.out and match.batting == PLAYER:
+        player_score_placeholder.metric("Total Runs", value=f"{match.player_score} Runs",border=True)
+        match.end_player_innings()
         st.rerun()
-    elif st.session_state.batting == "player":
-        player_score_placeholder.metric("Your Runs", value=f"{st.session_state.player_score} Runs", delta=int(st.session_state.last_player_num),border=True)
+    elif match.batting == PLAYER:
+        player_score_placeholder.metric("Your Runs", value=f"{match.player_score} Runs", delta=int(match.last_player_num),border=True)
     else:
-        bot_score_placeholder.metric("Bot Runs", value=f"{st.session_state.bot_score} / {st.session_state.player_score} Runs", delta=int(st.session_state.last_bot_num),border=True)
-        player_score_placeholder.metric("Your Move", value=f"{st.session_state.last_player_num}",border=True)
-
+        bot_score_placeholder.metric("Bot Runs", value=f"{match.bot_score} / {match.player_score} Runs", delta=int(match.last_bot_num),border=True)
+        player_score_placeholder.metric("Your Move", value=f"{match.last_player_num}",border=True)
     
 
 
@@ -367,12 +381,10 @@ if "running" not in st.session_state:
     st.session_state.running = False
     st.session_state.last_capture_time = 0
     st.session_state.frame_count = 0
-    st.session_state.player_score = 0
-    st.session_state.bot_score = 0
-    st.session_state.batting = "player"
-    st.session_state.out = False
-    st.session_state.last_player_num = None
-    st.session_state.last_bot_num = None
+    st.session_state.match = Match()
+if "bot" not in st.session_state:
+    # Learns this player's habits over the whole session, across games
+    st.session_state.bot = AdaptiveBot()
 
 # Button Layouts: Start Game | Stop Game | Rules
 # Icons: 🎮 
@@ -387,16 +399,13 @@ with col1_btn:
     if st.button("Start New Game", icon=':material/play_circle:'):
         st.session_state.running = True
         st.session_state.frame_count = 0
-        st.session_state.player_score = 0
-        st.session_state.bot_score = 0
-        st.session_state.batting = "player"
-        st.session_state.out = False
-        st.session_state.last_player_num = None
-        st.session_state.last_bot_num = None
+        st.session_state.match = Match()
         st.session_state.last_capture_time = time.monotonic()
 with col2_btn:
     if st.button("Stop Game", icon=':material/stop_circle:'):
         st.session_state.running = False
+        close_inference()
+        close_camera()
 with col3_btn:
     if st.button("Game Rules", icon=":material/gamepad:"):
         show_game_rules()
@@ -433,17 +442,13 @@ with col2:
     c, d = st.columns(2)
     with c:
         bot_score_placeholder = st.empty()
-if st.session_state.batting == "bot":
-    overlay_image = Image.open(f"overlays/start_bowling2.png")
-    player_video_placeholder.image(overlay_image)
-    player_score_placeholder.metric("Total Runs", value=f"{st.session_state.player_score} Runs",border=True)
+if st.session_state.match.batting == BOT:
+    player_video_placeholder.image(get_assets().overlay("start_bowling2"))
+    player_score_placeholder.metric("Total Runs", value=f"{st.session_state.match.player_score} Runs",border=True)
     if button_placeholder.button("Start Bowling", icon=":material/sports_cricket:"):
         st.session_state.running = True
         st.session_state.frame_count = 0
-        st.session_state.bot_score = 0
-        st.session_state.out = False
-        st.session_state.last_player_num = None
-        st.session_state.last_bot_num = None
+        st.session_state.match.start_bot_innings()
         st.session_state.last_capture_time = time.monotonic()
         # Badge Fixing for batting and bowling
         player_badge.badge(":material/sports_baseball: Bowling", color="red")
@@ -451,19 +456,43 @@ if st.session_state.batting == "bot":
         button_placeholder.empty()
         # st.rerun()
 
+# Diagnostics panel (optional): per-stage p50/p95 and effective FPS
+show_diagnostics = st.sidebar.toggle("Show diagnostics", value=False)
+diagnostics_placeholder = st.sidebar.empty()
+if show_diagnostics:
+    diagnostics_placeholder.markdown(diagnostics())
+
 # Webcam logic
 if st.session_state.running:
-    cap = cv2.VideoCapture(0)
-    while st.session_state.running and not st.session_state.out:
-        ret, frame = cap.read()
-        if not ret:
+    # OpenCV is only needed once a game is running
+    import cv2
+    from preview import PreviewPublisher
+
+    # Webcam preview: downscaled, rate-limited JPEG (inference still sees the full frame)
+    preview = PreviewPublisher(player_video_placeholder, fps=PREVIEW_FPS, width=PREVIEW_WIDTH,
+                               quality=PREVIEW_JPEG_QUALITY, monitor=perf)
+    models = live_model(MODEL_DIR)
+    camera = get_camera()
+    frame_seq = 0
+    bot_num = None
+    last_diagnostics = time.monotonic()
+    while st.session_state.running and not st.session_state.match.out:
+        prev_seq = frame_seq
+        with perf.stage("camera_wait"):
+            frame_seq, frame = camera.latest(after=frame_seq, timeout=3.0)
+        if frame is None:
             st.error("❌ Unable to access webcam")
+            close_camera()
             break
+        if prev_seq and frame_seq - prev_seq > 1:
+            # Frames the camera delivered while we were busy and we never looked at
+            perf.count("dropped", frame_seq - prev_seq - 1)
 
         # player_video_placeholder.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
-        frame = cv2.flip(frame, 1)
+        with perf.stage("flip"):
+            frame = cv2.flip(frame, 1)
         elapsed = time.monotonic() - st.session_state.last_capture_time
-        remaining = 3 - int(elapsed)
+        remaining = COUNTDOWN_SECONDS - int(elapsed)
 
         if remaining > 0:
             countdown_text = f"{remaining}"
@@ -474,7 +503,7 @@ if st.session_state.running:
             text_x = int((frame.shape[1] - text_size[0]) / 2)
             text_y = int((frame.shape[0] + text_size[1]) / 2)
             cv2.putText(frame, countdown_text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
-            player_video_placeholder.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
+            preview.push(frame)
         else:
             cv2.putText(frame, "Capturing...", (30, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (0,0,0), 3, cv2.LINE_AA)
 
@@ -486,37 +515,57 @@ if st.session_state.running:
             # # Draw flash (bright yellow rectangle)
             # cv2.rectangle(frame, (100, 20), (115, 35), (0, 255, 255), -1)  # Yellow flash (BGR)
 
-            player_video_placeholder.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
-            bot_num = np.random.randint(1, 2)
-            bot_hand_image = Image.open(f"bot_hands/{bot_num}.png")
-            bot_image_placeholder.image(bot_hand_image)
-            time.sleep(0.5)
-            player_num = predict(frame)
-            if player_num:
-                player_hand_error.empty()
-                play_turn(player_num, bot_num)
-                update_score()
-            else:
-                player_hand_error.error(":material/hand_gesture: Couldn't detect hand")
-            st.session_state.last_capture_time = time.monotonic()
+            preview.push(frame)
+            if bot_num is None:
+                # Start of the capture window: bot picks its number (shown only once the player's is final), voting starts fresh
+                bot_num = st.session_state.bot.choose(batting=st.session_state.match.batting == BOT)
+                # Same model for the whole turn; a new version only takes over at the next one
+                clf = models.get()
+                voter = GestureVoter(clf.classes_, min_confidence=VOTE_MIN_CONFIDENCE, min_stable_frames=VOTE_MIN_STABLE_FRAMES)
+
+            proba = predict_proba(frame, clf)
+            player_num = voter.add(proba) if proba is not None else None
+            window_closed = elapsed >= COUNTDOWN_SECONDS + CAPTURE_WINDOW_SECONDS
+            if player_num is None and window_closed:
+                player_num = voter.best()
+
+            if player_num is not None or window_closed:
+                if player_num:
+                    player_hand_error.empty()
+                    # Revealed only now, so the player cannot react to it during the window
+                    bot_image_placeholder.image(get_assets().bot_hand(bot_num))
+                    st.session_state.bot.observe(player_num)
+                    with perf.stage("play_turn"):
+                        play_turn(player_num, bot_num)
+                    update_score()
+                else:
+                    player_hand_error.error(":material/hand_gesture: Couldn't detect hand")
+                bot_num = None
+                st.session_state.last_capture_time = time.monotonic()
         # player_video_placeholder.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
 
-        if st.session_state.batting == "end":
+        perf.tick()
+        perf.maybe_export()
+        if show_diagnostics and time.monotonic() - last_diagnostics >= 1.0:
+            diagnostics_placeholder.markdown(diagnostics())
+            last_diagnostics = time.monotonic()
+
+        if st.session_state.match.batting == END:
             st.session_state.running = False
+            close_inference()
+            close_camera()
             break
-        
-    cap.release()
-    cv2.destroyAllWindows()
 
-if st.session_state.batting == "end":
+if st.session_state.match.batting == END:
     if button_placeholder.button("Play Again"):
         st.session_state.running = True
         st.session_state.frame_count = 0
-        st.session_state.player_score = 0
-        st.session_state.bot_score = 0
-        st.session_state.batting = "player"
-        st.session_state.out = False
-        st.session_state.last_player_num = None
-        st.session_state.last_bot_num = None
+        st.session_state.match = Match()
         st.session_state.last_capture_time = time.monotonic()
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+# Page is out: get the model and the assets ready for the first "Start New Game"
+prewarm = {"model": lambda: live_model(MODEL_DIR), "assets": get_assets}
+if PREWARM_INFERENCE:
+    prewarm["inference"] = lambda: inference_service(MODEL_DIR)
+warm_up("game", **prewarm)
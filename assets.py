@@ -0,0 +1,77 @@
+"""Bot hands and overlays, decoded, resized and encoded once per process.
+
+The source PNGs are 1280x800, far larger than the column they are shown in.
+Each one is shrunk to ``DISPLAY_WIDTH`` and encoded once: JPEG when fully
+opaque, optimised PNG when it really uses transparency. The pages pass these
+bytes straight to ``st.image``, which sends already-encoded bytes as they are
+instead of re-encoding a PIL image for every ball.
+"""
+import io
+import os
+import threading
+
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_HANDS_DIR = os.path.join(BASE_DIR, "bot_hands")
+OVERLAYS_DIR = os.path.join(BASE_DIR, "overlays")
+DISPLAY_WIDTH = 640
+JPEG_QUALITY = 90
+
+OVERLAYS = {
+    "win": "win.png",
+    "lose": "lost.png",
+    "tie": "tied.png",
+    "start_bowling": "start_bowling.png",
+    "start_bowling2": "start_bowling2.png",
+}
+
+
+def encode_image(path, width=DISPLAY_WIDTH):
+    with Image.open(path) as im:
+        im.load()
+    if im.width > width:
+        im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+    buf = io.BytesIO()
+    if im.mode == "RGBA" and im.getchannel("A").getextrema()[0] < 255:
+        im.save(buf, format="PNG", optimize=True)
+    else:
+        im.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+class AssetCache:
+    def __init__(self, width=DISPLAY_WIDTH):
+        self.bot_hands = {}
+        for name in os.listdir(BOT_HANDS_DIR):
+            stem, ext = os.path.splitext(name)
+            if ext == ".png" and stem.isdigit():
+                self.bot_hands[int(stem)] = encode_image(os.path.join(BOT_HANDS_DIR, name), width)
+        self.overlays = {
+            key: encode_image(os.path.join(OVERLAYS_DIR, name), width)
+            for key, name in OVERLAYS.items()
+            if os.path.exists(os.path.join(OVERLAYS_DIR, name))
+        }
+
+    def bot_hand(self, num):
+        return self.bot_hands[num]
+
+    def overlay(self, key):
+        return self.overlays[key]
+
+    def hand_signs(self):
+        """``[(number, bytes), ...]`` sorted by number, for the rules dialog."""
+        return sorted(self.bot_hands.items())
+
+
+_assets = None
+_assets_lock = threading.Lock()
+
+
+def get_assets():
+    """Process-wide asset cache, built on first use."""
+    global _assets
+    with _assets_lock:
+        if _assets is None:
+            _assets = AssetCache()
+        return _assets
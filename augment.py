@@ -0,0 +1,77 @@
+"""Landmark augmentation: new training samples from old ones, without touching the images.
+
+Each copy of a raw ``(63,)`` sample is
+
+* mirrored left/right (``x -> 1 - x``) with probability ``mirror``,
+* rotated about the wrist by a small random 3D rotation (up to ``roll``
+  degrees in the image plane, ``tilt`` degrees out of it). MediaPipe scales x
+  (and z) by the frame width and y by its height, so y is first brought to
+  width units with the frame's ``aspect`` (height / width); rotating without
+  that would shear the hand on a non-square frame,
+* scaled about the wrist by a factor in ``scale``, and
+* jittered per coordinate with Gaussian noise of std ``jitter``.
+
+All of it is a few array operations per batch of ``batch_size`` samples, so
+augmenting the whole dataset costs far less than the fit it feeds. The RNG is
+seeded, so the same ``seed`` gives the same training set.
+"""
+import numpy as np
+
+from features import N_LANDMARKS, RAW_FEATURES, WRIST
+
+COPIES = 2
+MIRROR = 0.5
+ROLL_DEGREES = 15.0
+TILT_DEGREES = 10.0
+SCALE = (0.85, 1.15)
+JITTER = 0.004
+# Height / width of the frames the landmarks came from (640x480 webcam)
+ASPECT = 480 / 640
+BATCH_SIZE = 8192
+
+
+def rotations(rng, n, roll=ROLL_DEGREES, tilt=TILT_DEGREES):
+    """``n`` random ``(3, 3)`` rotation matrices: about z up to ``roll``°, about x and y up to ``tilt``°."""
+    ax, ay = np.radians(rng.uniform(-tilt, tilt, (2, n)))
+    az = np.radians(rng.uniform(-roll, roll, n))
+    cx, sx, cy, sy, cz, sz = np.cos(ax), np.sin(ax), np.cos(ay), np.sin(ay), np.cos(az), np.sin(az)
+    # Rz @ Ry @ Rx, written out per sample
+    return np.stack([
+        np.stack([cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx], axis=-1),
+        np.stack([sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx], axis=-1),
+        np.stack([-sy, cy * sx, cy * cx], axis=-1),
+    ], axis=1).astype(np.float32)
+
+
+def augment(X, rng, mirror=MIRROR, roll=ROLL_DEGREES, tilt=TILT_DEGREES, scale=SCALE, jitter=JITTER,
+            aspect=ASPECT):
+    """One augmented copy of every row of raw ``(N, 63)`` landmarks ``X``."""
+    n = len(X)
+    pts = np.array(X, dtype=np.float32).reshape(n, N_LANDMARKS, 3)
+    flip = rng.random(n) < mirror
+    pts[flip, :, 0] = 1.0 - pts[flip, :, 0]
+
+    wrist = pts[:, WRIST:WRIST + 1].copy()
+    pts -= wrist
+    pts[:, :, 1] *= aspect
+    pts = pts @ rotations(rng, n, roll, tilt).transpose(0, 2, 1)
+    pts[:, :, 1] /= aspect
+    pts *= rng.uniform(*scale, n).astype(np.float32).reshape(n, 1, 1)
+    pts += wrist
+    pts += jitter * rng.standard_normal(pts.shape, dtype=np.float32)
+    return pts.reshape(n, RAW_FEATURES)
+
+
+def augment_dataset(X, y, copies=COPIES, seed=0, batch_size=BATCH_SIZE, **params):
+    """``(X, y)`` followed by ``copies`` augmented copies of it, built ``batch_size`` rows at a time."""
+    X = np.asarray(X)
+    y = np.asarray(y)
+    n = len(y)
+    out = np.empty(((copies + 1) * n, RAW_FEATURES), dtype=np.float32)
+    out[:n] = X
+    rng = np.random.default_rng(seed)
+    for c in range(1, copies + 1):
+        for start in range(0, n, batch_size):
+            stop = min(start + batch_size, n)
+            out[c * n + start:c * n + stop] = augment(X[start:stop], rng, **params)
+    return out, np.tile(y, copies + 1)
@@ -0,0 +1,216 @@
+"""Replay recorded data through the detect -> featurize -> classify pipeline.
+
+The input directory uses the same layout as ``dataset/``: one folder per
+label, holding images and/or recorded videos (every video frame counts as a
+sample of its folder's label). Videos run through a video-mode tracker, like
+the live game; images through a static-mode detector, like training.
+
+    python benchmark.py                                   # dataset/, live model
+    python benchmark.py --data recordings --model model/handcricket-v3.pkl
+    python benchmark.py --save-baseline                   # store as the reference run
+    python benchmark.py --baseline bench/baseline.json    # compare, exit 1 on regression
+    python benchmark.py --data recordings --track-roi both  # video detection rate with and without the ROI crop
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from features import RAW_FEATURES, model_input, schema_for
+from perf import PerfMonitor
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+BASELINE_FILE = "bench/baseline.json"
+
+
+def iter_samples(data_dir, max_frames=None):
+    """Yield ``(label, source, frame)``; ``source`` is ``"image"`` or the video path."""
+    import cv2
+    for label in sorted(os.listdir(data_dir)):
+        label_dir = os.path.join(data_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            path = os.path.join(label_dir, name)
+            ext = os.path.splitext(name)[1].lower()
+            if ext in IMAGE_EXTENSIONS:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    yield int(label), "image", frame
+            elif ext in VIDEO_EXTENSIONS:
+                cap = cv2.VideoCapture(path)
+                n = 0
+                while max_frames is None or n < max_frames:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    n += 1
+                    yield int(label), path, frame
+                cap.release()
+
+
+def run(data_dir, clf, max_frames=None, track_roi=True):
+    from hand_detector import HandDetector
+
+    monitor = PerfMonitor("benchmark", window=100_000)
+    schema = schema_for(clf)
+    classes = [int(c) for c in clf.classes_]
+    index = {c: i for i, c in enumerate(classes)}
+    confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    buffer = np.empty(RAW_FEATURES, dtype=np.float32)
+    frames = detected = video_frames = video_detected = 0
+
+    static = HandDetector(static_image_mode=True, max_num_hands=1, monitor=monitor)
+    video, video_source = None, None
+    start = time.perf_counter()
+    try:
+        for label, source, frame in iter_samples(data_dir, max_frames):
+            if source == "image":
+                detector = static
+            else:
+                # Fresh tracker per video so tracking state never leaks between recordings
+                if source != video_source:
+                    if video is not None:
+                        video.close()
+                    video = HandDetector(static_image_mode=False, max_num_hands=1, monitor=monitor,
+                                         track_roi=track_roi)
+                    video_source = source
+                detector = video
+                video_frames += 1
+
+            frames += 1
+            t0 = time.perf_counter()
+            landmarks = detector.process(frame, draw=False)
+            if landmarks is None:
+                monitor.count("undetected")
+            else:
+                detected += 1
+                video_detected += detector is video
+                with monitor.stage("featurize"):
+                    data = model_input(landmarks, schema, buffer)
+                with monitor.stage("classify"):
+                    pred = int(clf.predict(data)[0])
+                if label in index:
+                    confusion[index[label], index[pred]] += 1
+            monitor.record("pipeline", time.perf_counter() - t0)
+    finally:
+        static.close()
+        if video is not None:
+            video.close()
+
+    wall = time.perf_counter() - start
+    snapshot = monitor.snapshot()
+    correct = int(np.trace(confusion))
+    per_class = {
+        str(c): round(float(confusion[i, i] / confusion[i].sum()), 4) if confusion[i].sum() else None
+        for i, c in enumerate(classes)
+    }
+    return {
+        "data_dir": data_dir,
+        "track_roi": track_roi,
+        "frames": frames,
+        "detected": detected,
+        "detection_rate": round(detected / frames, 4) if frames else 0.0,
+        # Video frames only: the ones the tracker (and its ROI crop) handles
+        "video_frames": video_frames,
+        "video_detection_rate": round(video_detected / video_frames, 4) if video_frames else None,
+        "accuracy": round(correct / confusion.sum(), 4) if confusion.sum() else 0.0,
+        "per_class_accuracy": per_class,
+        # Pipeline throughput only: excludes disk reads and video decoding
+        "fps": round(frames / sum_ms(snapshot, "pipeline") * 1000.0, 2) if frames else 0.0,
+        "wall_seconds": round(wall, 2),
+        "stages": snapshot["stages"],
+        "classes": classes,
+        "confusion_matrix": confusion.tolist(),
+    }
+
+
+def sum_ms(snapshot, stage):
+    s = snapshot["stages"].get(stage)
+    return s["mean_ms"] * s["count"] if s else float("nan")
+
+
+def compare(result, baseline, max_accuracy_drop=0.01, max_latency_increase=0.2):
+    """Human-readable regressions of ``result`` against ``baseline`` (empty list = OK)."""
+    problems = []
+    for key in ("accuracy", "detection_rate"):
+        if result[key] < baseline[key] - max_accuracy_drop:
+            problems.append(f"{key} {baseline[key]:.4f} -> {result[key]:.4f}")
+    for stage, base in baseline["stages"].items():
+        cur = result["stages"].get(stage)
+        if cur and cur["p50_ms"] > base["p50_ms"] * (1 + max_latency_increase):
+            problems.append(f"{stage} p50 {base['p50_ms']:.2f} ms -> {cur['p50_ms']:.2f} ms")
+    return problems
+
+
+def print_report(result):
+    roi = "on" if result["track_roi"] else "off"
+    print(f"📊 {result['frames']} frames from {result['data_dir']} in {result['wall_seconds']} s (track_roi {roi})")
+    print(f"   pipeline FPS: {result['fps']}  detection rate: {result['detection_rate']:.2%}  accuracy: {result['accuracy']:.2%}")
+    if result["video_frames"]:
+        print(f"   video detection rate: {result['video_detection_rate']:.2%} of {result['video_frames']} frames")
+    print(f"   {'stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'n':>8}")
+    for name, s in result["stages"].items():
+        print(f"   {name:<18}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['count']:>8}")
+    print("   confusion matrix (rows = true, cols = predicted):")
+    print("        " + "".join(f"{c:>5}" for c in result["classes"]))
+    for c, row in zip(result["classes"], result["confusion_matrix"]):
+        print(f"   {c:>4} " + "".join(f"{v:>5}" for v in row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="dataset", help="folder of <label>/ images and videos")
+    parser.add_argument("--model", help="model .pkl (default: current registry version)")
+    parser.add_argument("--max-frames", type=int, help="cap frames read per video")
+    parser.add_argument("--track-roi", choices=("on", "off", "both"), default="on",
+                        help="run the video tracker on a crop around the hand (both: run twice and compare)")
+    parser.add_argument("--output", help="write the full result JSON here")
+    parser.add_argument("--baseline", help="compare against this result JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store the result as {BASELINE_FILE}")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    parser.add_argument("--max-latency-increase", type=float, default=0.2, help="allowed p50 growth, 0.2 = +20%%")
+    args = parser.parse_args(argv)
+
+    from forest_export import load_classifier
+    from model_registry import resolve_current
+    model_path = args.model or resolve_current()[0]
+    clf = load_classifier(model_path)
+    print(f"🤖 Model: {model_path} ({type(clf).__name__}, {schema_for(clf)} features)")
+
+    result = run(args.data, clf, args.max_frames, track_roi=args.track_roi != "off")
+    result["model"] = model_path
+    print_report(result)
+    if args.track_roi == "both":
+        full = run(args.data, clf, args.max_frames, track_roi=False)
+        print_report(full)
+        result["without_track_roi"] = {k: full[k] for k in ("detection_rate", "video_detection_rate", "accuracy", "fps")}
+        if result["video_frames"]:
+            print(f"🎯 Video detection rate: {result['video_detection_rate']:.2%} with track_roi,"
+                  f" {full['video_detection_rate']:.2%} without")
+
+    for path in filter(None, [args.output, BASELINE_FILE if args.save_baseline else None]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Result written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(result, baseline, args.max_accuracy_drop, args.max_latency_increase)
+        if problems:
+            print("❌ Regressions against baseline:")
+            for p in problems:
+                print(f"   - {p}")
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Bot opponents.
+
+A live bot answers two calls per ball:
+
+    bot.choose(batting) -> int      # the bot's number for this ball
+    bot.observe(player_num)         # the player's number, once it is known
+
+``AdaptiveBot`` models the player online: decayed counts of which number
+follows which (an order-1 Markov table) plus overall counts. All its state
+is a fixed ``(11, 10)`` table and a ``(10,)`` vector, so a decision or an
+update touches ten numbers no matter how long the session is. When bowling
+it leans towards the player's likely next number; when batting it plays big
+numbers the player is unlikely to show.
+
+``AdaptivePolicy`` is the same model for many matches at once, for
+``simulate.py``. Run this file to benchmark decision latency and strength:
+
+    python bot_policy.py
+"""
+import time
+
+import numpy as np
+
+MAX_NUM = 10
+NUMS = np.arange(1, MAX_NUM + 1, dtype=np.float64)
+
+
+def predict(bigram_row, unigram, prior=1.0, bigram_weight=0.7):
+    """Probability of each next player number 1-10 (works on ``(..., 10)`` arrays)."""
+    b = bigram_row + prior / MAX_NUM
+    u = unigram + prior / MAX_NUM
+    b = b / b.sum(axis=-1, keepdims=True)
+    u = u / u.sum(axis=-1, keepdims=True)
+    return bigram_weight * b + (1.0 - bigram_weight) * u
+
+
+def choice_weights(p, batting, sharpness):
+    if batting:
+        # Score runs, but stay away from what the player is likely to bowl
+        return NUMS * (1.0 - p) ** sharpness
+    # Bowl what the player is likely to show
+    return p ** sharpness
+
+
+def sample(rng, weights):
+    """One number 1-10 per row of ``weights``."""
+    cdf = np.cumsum(weights, axis=-1)
+    u = rng.random(weights.shape[:-1] + (1,)) * cdf[..., -1:]
+    return (cdf < u).sum(axis=-1) + 1
+
+
+class RandomBot:
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def choose(self, batting):
+        return int(self.rng.integers(1, MAX_NUM + 1))
+
+    def observe(self, player_num):
+        pass
+
+
+class AdaptiveBot:
+    def __init__(self, decay=0.9, sharpness=2.0, prior=1.0, bigram_weight=0.7, seed=None):
+        self.decay = decay
+        self.sharpness = sharpness
+        self.prior = prior
+        self.bigram_weight = bigram_weight
+        self.rng = np.random.default_rng(seed)
+        # Row 0 is "no previous number" (start of the session)
+        self.bigram = np.zeros((MAX_NUM + 1, MAX_NUM))
+        self.unigram = np.zeros(MAX_NUM)
+        self.prev = 0
+
+    def predict(self):
+        return predict(self.bigram[self.prev], self.unigram, self.prior, self.bigram_weight)
+
+    def choose(self, batting):
+        weights = choice_weights(self.predict(), batting, self.sharpness)
+        return int(sample(self.rng, weights))
+
+    def observe(self, player_num):
+        row = self.bigram[self.prev]
+        row *= self.decay
+        row[player_num - 1] += 1.0
+        self.unigram *= self.decay
+        self.unigram[player_num - 1] += 1.0
+        self.prev = player_num
+
+
+class AdaptivePolicy:
+    """``AdaptiveBot`` for every match of a ``simulate.py`` batch (one table per match)."""
+
+    def __init__(self, decay=0.9, sharpness=2.0, prior=1.0, bigram_weight=0.7):
+        self.decay = decay
+        self.sharpness = sharpness
+        self.prior = prior
+        self.bigram_weight = bigram_weight
+
+    def reset(self, n_matches):
+        self.bigram = np.zeros((n_matches, MAX_NUM + 1, MAX_NUM), dtype=np.float32)
+        self.unigram = np.zeros((n_matches, MAX_NUM), dtype=np.float32)
+        self.prev = np.zeros(n_matches, dtype=np.int64)
+
+    def choose(self, rng, idx, batting):
+        p = predict(self.bigram[idx, self.prev[idx]], self.unigram[idx], self.prior, self.bigram_weight)
+        return sample(rng, choice_weights(p, batting, self.sharpness))
+
+    def observe(self, idx, opponent_nums):
+        col = opponent_nums - 1
+        prev = self.prev[idx]
+        self.bigram[idx, prev] *= self.decay
+        self.bigram[idx, prev, col] += 1.0
+        self.unigram[idx] *= self.decay
+        self.unigram[idx, col] += 1.0
+        self.prev[idx] = opponent_nums
+
+
+def benchmark(balls=20_000, matches=100_000):
+    from simulate import UniformPolicy, WeightedPolicy, simulate
+
+    bot = AdaptiveBot(seed=0)
+    rng = np.random.default_rng(1)
+    player_nums = rng.integers(1, MAX_NUM + 1, size=balls)
+    start = time.perf_counter()
+    for i, num in enumerate(player_nums):
+        bot.choose(batting=bool(i & 1))
+        bot.observe(int(num))
+    per_ball = (time.perf_counter() - start) / balls
+    print(f"⏱️  AdaptiveBot choose + observe: {per_ball * 1e6:.1f} µs per ball")
+
+    # A player with a favourite number, and one that never changes strategy
+    habits = [0.05, 0.05, 0.05, 0.05, 0.1, 0.4, 0.1, 0.1, 0.05, 0.05]
+    for name, player in [("uniform", UniformPolicy), ("habitual", lambda: WeightedPolicy(habits))]:
+        for bot_name, bot_policy in [("uniform", UniformPolicy), ("adaptive", AdaptivePolicy)]:
+            summary = simulate(matches, bot_policy(), player(), seed=2)["summary"]
+            print(f"   bot={bot_name:<8} vs player={name:<8} player wins {summary['win_rate']:.1%}"
+                  f" · loses {summary['lose_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,115 @@
+import threading
+import time
+import weakref
+from collections import deque
+
+import cv2
+
+
+class _StreamState:
+    """What the reader thread shares with a ``CameraStream`` (never the stream itself)."""
+
+    def __init__(self, buffer_size):
+        self.frames = deque(maxlen=buffer_size)
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.cap = None
+        self.thread = None
+        self.running = False
+        self.error = None
+
+
+def _reader(state):
+    while state.running:
+        ret, frame = state.cap.read()
+        if not ret:
+            with state.cond:
+                state.error = "Unable to read from camera"
+                state.running = False
+                state.cond.notify_all()
+            break
+        with state.cond:
+            state.seq += 1
+            state.frames.append((state.seq, frame))
+            state.cond.notify_all()
+
+
+def _stop(state):
+    with state.cond:
+        state.running = False
+        state.cond.notify_all()
+    if state.thread is not None and state.thread is not threading.current_thread():
+        state.thread.join(timeout=1.0)
+    if state.cap is not None:
+        state.cap.release()
+    state.cap = None
+    state.thread = None
+    state.frames.clear()
+
+
+class CameraStream:
+    """Reads a ``cv2.VideoCapture`` on a background thread.
+
+    Only the newest ``buffer_size`` frames are kept, so the consumer always
+    sees fresh video and never waits on camera I/O. Frames are numbered so a
+    caller can ask for "a frame newer than the one I last handled".
+
+    Stopped explicitly with ``stop()``, or when the stream is garbage collected
+    (e.g. with the Streamlit session that held it): the reader thread only
+    holds the shared state, so it does not keep the stream alive.
+    """
+
+    def __init__(self, source=0, buffer_size=2):
+        self.source = source
+        self._state = _StreamState(buffer_size)
+        self._finalizer = None
+
+    def start(self):
+        state = self._state
+        if state.running:
+            return self
+        state.cap = cv2.VideoCapture(self.source)
+        # Ask the driver not to queue frames behind our back (not every backend honours it)
+        state.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        state.running = True
+        state.error = None
+        state.thread = threading.Thread(target=_reader, args=(state,), name="camera-reader", daemon=True)
+        state.thread.start()
+        self._finalizer = weakref.finalize(self, _stop, state)
+        return self
+
+    @property
+    def running(self):
+        return self._state.running
+
+    @property
+    def error(self):
+        return self._state.error
+
+    def latest(self, after=0, timeout=1.0):
+        """Return ``(seq, frame)`` for the newest frame with ``seq > after``.
+
+        Blocks for at most ``timeout`` seconds; returns ``(after, None)`` if no
+        newer frame arrived (camera stalled or stopped).
+        """
+        state = self._state
+        deadline = time.monotonic() + timeout
+        with state.cond:
+            while not state.frames or state.frames[-1][0] <= after:
+                remaining = deadline - time.monotonic()
+                if not state.running or remaining <= 0:
+                    return after, None
+                state.cond.wait(remaining)
+            return state.frames[-1]
+
+    def stop(self):
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            _stop(self._state)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,171 @@
+"""Scoring models on the fixed holdout, and the promotion gate.
+
+The holdout is a versioned file, ``data/holdout/holdout-v<N>.npz``, of raw
+landmarks and labels. It is built once from the rows ``split_holdout``
+reserves in the landmark store, then kept as is, so every model version is
+compared on exactly the same samples. Its SHA-1 goes into every report. To
+change the holdout, bump ``HOLDOUT_VERSION``.
+
+``promotion_report`` scores a candidate and the current model side by side:
+accuracy overall and per class, and the latency of one frame in the form
+each one is served. ``gate`` lists every regression. A retrain only publishes
+when that list is empty.
+
+The holdout is small (about 20 samples per class), so a single sample moves
+a class's accuracy by 5%. Accuracy is therefore compared sample by sample,
+McNemar style. ``lost`` counts the samples the current model gets right and
+the candidate gets wrong, and ``gained`` counts the reverse. A regression is
+a net loss larger than both ``MIN_LOST_SAMPLES`` and ``Z`` standard errors
+(``sqrt(lost + gained)``), overall and within each class.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from features import build_features, schema_for
+from forest_update import split_holdout
+
+HOLDOUT_VERSION = 1
+HOLDOUT_DIR = "data/holdout"
+LATENCY_CALLS = 300
+LATENCY_ROUNDS = 3
+
+# Net samples lost before a drop can count as a regression, and how significant it must be (one-sided 5%)
+MIN_LOST_SAMPLES = 2
+Z = 1.645
+MAX_LATENCY_INCREASE = 0.5
+# Below this, latency differences are timer noise
+LATENCY_NOISE_US = 20.0
+
+
+def holdout_path(version=HOLDOUT_VERSION, root=HOLDOUT_DIR):
+    return os.path.join(root, f"holdout-v{version}.npz")
+
+
+def load_holdout(dataset=None, version=HOLDOUT_VERSION, root=HOLDOUT_DIR):
+    """``(X_raw, y, info)`` of the fixed holdout, built from ``dataset`` if the file does not exist yet."""
+    path = holdout_path(version, root)
+    if not os.path.exists(path):
+        if dataset is None:
+            raise FileNotFoundError(f"No holdout at {path} and no dataset to build it from")
+        X, y = dataset.arrays()
+        _, idx = split_holdout(len(y))
+        os.makedirs(root, exist_ok=True)
+        np.savez(path, X=np.asarray(X[idx], dtype=np.float32), y=np.asarray(y[idx]), rows=idx)
+    with open(path, "rb") as f:
+        sha1 = hashlib.sha1(f.read()).hexdigest()
+    with np.load(path) as data:
+        X, y = data["X"], data["y"]
+    return X, y, {"version": version, "file": path, "rows": int(len(y)), "sha1": sha1}
+
+
+def served_form(model, workdir, name):
+    """What ``LiveModel`` would serve for ``model``, plus its pickle and flat-export sizes in bytes."""
+    import joblib
+
+    from forest_export import FlatForest, export_forest, flat_path, is_forest
+
+    pkl = os.path.join(workdir, f"{name}.pkl")
+    joblib.dump(model, pkl)
+    size = os.path.getsize(pkl)
+    if is_forest(model):
+        export_forest(model, flat_path(pkl))
+        return FlatForest.load(flat_path(pkl)), size, os.path.getsize(flat_path(pkl))
+    return model, size, None
+
+
+def predict(model, X_raw):
+    return model.predict(build_features(X_raw, schema_for(model)))
+
+
+def accuracy_report(pred, y):
+    """Overall and per-class accuracy (recall) of predictions ``pred`` for labels ``y``."""
+    per_class = {str(label): float(np.mean(pred[y == label] == label)) for label in np.unique(y)}
+    return {"accuracy": float(np.mean(pred == y)), "per_class": per_class}
+
+
+def paired_losses(y, pred_candidate, pred_current):
+    """``{"lost": n, "gained": n}`` overall and per class: samples only the current / only the candidate gets right."""
+    old_right, new_right = pred_current == y, pred_candidate == y
+    lost, gained = old_right & ~new_right, new_right & ~old_right
+
+    def counts(mask):
+        return {"lost": int(np.sum(lost & mask)), "gained": int(np.sum(gained & mask))}
+
+    return {"overall": counts(np.ones(len(y), bool)),
+            "per_class": {str(label): counts(y == label) for label in np.unique(y)}}
+
+
+def regressed(counts, min_lost=MIN_LOST_SAMPLES, z=Z):
+    """Whether a net loss is larger than both ``min_lost`` samples and ``z`` standard errors."""
+    net = counts["lost"] - counts["gained"]
+    return bool(net > max(min_lost, z * np.sqrt(counts["lost"] + counts["gained"])))
+
+
+def paired_latency(models, X_raw, calls=LATENCY_CALLS, rounds=LATENCY_ROUNDS, seed=0):
+    """Median single-row ``predict_proba`` latency (µs) per model.
+
+    The models take turns call by call, so drift (frequency scaling, other
+    load) hits all of them alike, and the turn order is reshuffled in each of
+    ``rounds`` rounds so no model always runs right after the same neighbour.
+    """
+    rng = np.random.default_rng(seed)
+    rows = [build_features(X_raw[:1], schema_for(m)).reshape(1, -1) for m in models]
+    times = np.empty((len(models), rounds * calls))
+    for model, row in zip(models, rows):
+        model.predict_proba(row)
+    for r in range(rounds):
+        order = rng.permutation(len(models))
+        for i in range(r * calls, (r + 1) * calls):
+            for j in order:
+                start = time.perf_counter()
+                models[j].predict_proba(rows[j])
+                times[j, i] = time.perf_counter() - start
+    return (np.median(times, axis=1) * 1e6).tolist()
+
+
+def gate(candidate, current, losses, min_lost=MIN_LOST_SAMPLES, z=Z, max_latency_increase=MAX_LATENCY_INCREASE):
+    """Every way ``candidate`` regresses against ``current`` (entries and ``losses`` of a ``promotion_report``)."""
+    problems = []
+    if regressed(losses["overall"], min_lost, z):
+        problems.append(f"accuracy {current['accuracy']:.4f} -> {candidate['accuracy']:.4f}"
+                        f" ({losses['overall']['lost']} samples lost, {losses['overall']['gained']} gained)")
+    for label, counts in losses["per_class"].items():
+        if regressed(counts, min_lost, z):
+            problems.append(f"class {label} accuracy {current['per_class'][label]:.3f} ->"
+                            f" {candidate['per_class'][label]:.3f} ({counts['lost']} lost, {counts['gained']} gained)")
+    slower = candidate["latency_us"] - current["latency_us"]
+    if slower > LATENCY_NOISE_US and slower > max_latency_increase * current["latency_us"]:
+        problems.append(f"latency {current['latency_us']:.0f} -> {candidate['latency_us']:.0f} µs")
+    return problems
+
+
+def promotion_report(candidate, current, X_raw, y, holdout_info=None, **thresholds):
+    """Score ``candidate`` (and ``current``, if any) on the holdout and decide whether to promote.
+
+    Both are scored in their served form; the accuracy runs in parallel, the
+    latency is timed in alternation on one thread.
+    """
+    import tempfile
+
+    thresholds = {"min_lost": MIN_LOST_SAMPLES, "z": Z, "max_latency_increase": MAX_LATENCY_INCREASE, **thresholds}
+    with tempfile.TemporaryDirectory() as workdir:
+        served_candidate, pkl_bytes, flat_bytes = served_form(candidate, workdir, "candidate")
+        models = [served_candidate] + ([current] if current is not None else [])
+        with ThreadPoolExecutor(max_workers=len(models)) as pool:
+            preds = list(pool.map(lambda m: predict(m, X_raw), models))
+        latencies = paired_latency(models, X_raw)
+
+    entries = [dict(accuracy_report(pred, y), latency_us=latency) for pred, latency in zip(preds, latencies)]
+    entries[0]["size_bytes"] = flat_bytes or pkl_bytes
+    report = {"holdout": holdout_info, "thresholds": thresholds, "candidate": entries[0]}
+    if current is None:
+        report.update(current=None, losses=None, problems=[], promoted=True)
+    else:
+        losses = paired_losses(y, preds[0], preds[1])
+        problems = gate(entries[0], entries[1], losses, **thresholds)
+        report.update(current=entries[1], losses=losses, problems=problems, promoted=not problems)
+    return report
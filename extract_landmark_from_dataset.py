@@ -1,34 +1,14 @@
-import cv2
-import os
-import numpy as np
-import mediapipe as mp
-import joblib
+from landmark_extraction import append_images, extract_rows, save_dataset, OUTPUT_FILE
+from landmark_store import LANDMARK_STORE_DIR, open_dataset
 
-def extract_landmarks(image):
-    mp_hands = mp.solutions.hands
-    with mp_hands.Hands(static_image_mode=True) as hands:
-        results = hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        if results.multi_hand_landmarks:
-            landmarks = results.multi_hand_landmarks[0]
-            return np.array([[lm.x, lm.y, lm.z] for lm in landmarks.landmark]).flatten()
-    return None
+if __name__ == "__main__":
+    X, y, hashes = extract_rows("dataset")
 
-X, y = [], []
+    # Save preprocessed dataset
+    save_dataset(X, y, OUTPUT_FILE, hashes)
 
-for label in os.listdir("dataset"):
-    for img_file in os.listdir(f"dataset/{label}"):
-        path = f"dataset/{label}/{img_file}"
-        image = cv2.imread(path)
-        features = extract_landmarks(image)
-        if features is not None:
-            X.append(features)
-            y.append(int(label))
+    print(f"✅ Landmarks saved to {OUTPUT_FILE}")
 
-X = np.array(X)
-y = np.array(y)
-
-# Save preprocessed dataset
-os.makedirs("data", exist_ok=True)
-np.savez_compressed("data/handcricket_landmarks.npz", X=X, y=y)
-
-print("✅ Landmarks saved to data/handcricket_landmarks.npz")
\ No newline at end of file
+    # Append newly collected images to the landmark store (all cache hits by now)
+    added = append_images(open_dataset(LANDMARK_STORE_DIR, OUTPUT_FILE))
+    print(f"✅ {added} new samples appended to {LANDMARK_STORE_DIR}")
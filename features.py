@@ -0,0 +1,80 @@
+"""Landmark -> feature conversion shared by the game, the feedback page and training.
+
+Two feature schemas exist:
+
+* ``raw``: the 21 MediaPipe landmarks as image-relative x/y/z (63 values).
+  This is what ``data/handcricket_landmarks.npz`` stores and what older
+  models were trained on.
+* ``normalized``: wrist-relative, scaled by the wrist -> middle-finger-MCP
+  distance and mirrored so every hand has the same chirality. The wrist
+  itself is then always zero and is dropped (60 values).
+
+A model's schema follows from its input width, so old raw models keep working.
+"""
+import numpy as np
+
+N_LANDMARKS = 21
+RAW_FEATURES = N_LANDMARKS * 3
+NORMALIZED_FEATURES = (N_LANDMARKS - 1) * 3
+
+WRIST, INDEX_MCP, MIDDLE_MCP, PINKY_MCP = 0, 5, 9, 17
+
+
+def landmarks_to_features(landmarks, out=None):
+    """Copy a MediaPipe landmark list into a flat float32 ``(63,)`` buffer.
+
+    Pass a preallocated ``out`` to reuse one buffer across frames.
+    """
+    if out is None:
+        out = np.empty(RAW_FEATURES, dtype=np.float32)
+    i = 0
+    for lm in landmarks.landmark:
+        out[i] = lm.x
+        out[i + 1] = lm.y
+        out[i + 2] = lm.z
+        i += 3
+    return out
+
+
+def normalize_features(X, left=None):
+    """Map raw ``(N, 63)`` (or ``(63,)``) landmarks to the ``normalized`` schema.
+
+    ``left`` marks hands to mirror. When it is None the chirality is read from
+    the landmarks themselves (the sign of the palm's wrist/index/pinky
+    triangle), which also works for the existing dataset that has no
+    handedness labels.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    single = X.ndim == 1
+    pts = X.reshape(-1, N_LANDMARKS, 3) - X.reshape(-1, N_LANDMARKS, 3)[:, WRIST:WRIST + 1]
+
+    if left is None:
+        a = pts[:, INDEX_MCP]
+        b = pts[:, PINKY_MCP]
+        left = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0] < 0
+    mirror = np.where(np.asarray(left, dtype=bool), -1.0, 1.0).astype(np.float32)
+    pts[:, :, 0] *= mirror.reshape(-1, 1)
+
+    scale = np.linalg.norm(pts[:, MIDDLE_MCP], axis=1)
+    pts /= np.maximum(scale, 1e-6).reshape(-1, 1, 1)
+
+    out = pts[:, 1:].reshape(len(pts), NORMALIZED_FEATURES)
+    return out[0] if single else out
+
+
+def schema_for(model):
+    """Feature schema a fitted model expects, from its input width."""
+    return "normalized" if model.n_features_in_ == NORMALIZED_FEATURES else "raw"
+
+
+def build_features(raw, schema):
+    """Turn raw ``(N, 63)`` landmarks into the given schema."""
+    if schema == "normalized":
+        return normalize_features(raw)
+    return np.asarray(raw, dtype=np.float32)
+
+
+def model_input(landmarks, schema, out=None):
+    """One detected hand -> a ``(1, n_features)`` row ready for ``predict``."""
+    raw = landmarks_to_features(landmarks, out)
+    return build_features(raw, schema).reshape(1, -1)
@@ -0,0 +1,316 @@
+"""Local store of landmarks from feedback rows.
+
+Every ingested feedback row is kept once, keyed by its ``feedback_id`` (older
+rows: their ``image_filename``), together with a high-water mark (the newest
+``timestamp`` seen). Landmarks are appended to the shared ``LandmarkDataset``;
+this store only remembers which rows it has already handled. A sync only
+asks the source for rows from ``SYNC_OVERLAP`` seconds before that mark on:
+a row whose insert was slow or retried can commit after newer ones, and
+re-reading rows already handled costs nothing but the fetch.
+
+Rows from the feedback page carry the 63 landmark values the page already
+computed, and those go straight into the dataset. Only rows without them
+(older feedback) need their image: it is downloaded with bounded
+parallelism, decoded in memory and run through MediaPipe.
+
+Users tend to send many near-identical frames of the same mistake, so a sync
+does not take every new row:
+
+* Rows are ranked by ``priority``. A prediction the user corrected counts
+  most. After that, the less sure the serving model was (from the submitted
+  ``probabilities``), the higher the row ranks.
+* Near-duplicates are dropped. Two samples count as duplicates when they have
+  the same label and the same ``dedup_key``: the hand's fingertip and PIP
+  joint positions, normalized and quantized to a ``DEDUP_STEP`` grid. Keys
+  persist across syncs, so a pose that has already been ingested is not
+  ingested again.
+* At most ``max_rows`` rows are ingested per sync, highest priority first.
+  Rows over that budget are deferred: they are kept in ``deferred.jsonl``
+  and ranked again at the next sync, together with whatever has arrived
+  since. Image rows whose download failed wait there too. The high-water
+  mark still moves past everything fetched, so a sync only fetches new
+  rows. Image-only rows are not downloaded until they make the cut.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from features import N_LANDMARKS, RAW_FEATURES, landmarks_to_features, normalize_features
+
+FEEDBACK_STORE_DIR = "data/feedback_store"
+DOWNLOAD_WORKERS = 8
+MAX_SYNC_ROWS = 2000
+# Seconds below the high-water mark that every sync reads again
+SYNC_OVERLAP = 600
+# Fingertips and PIP joints (landmark numbers); their x/y pin down the pose
+DEDUP_LANDMARKS = (3, 4, 7, 8, 11, 12, 15, 16, 19, 20)
+# Grid step in normalized units (wrist -> middle-finger MCP = 1)
+DEDUP_STEP = 0.35
+DISAGREEMENT_WEIGHT = 1.0
+
+
+class SupabaseFeedbackSource:
+    """Feedback rows from the Supabase ``feedback`` table, images from a storage bucket."""
+
+    def __init__(self, client, bucket="feedback-images", table="feedback"):
+        self.client = client
+        self.bucket = bucket
+        self.table = table
+
+    def fetch_rows(self, since=None):
+        query = self.client.table(self.table).select("*")
+        if since:
+            query = query.gte("timestamp", since)
+        return query.order("timestamp").execute().data
+
+    def download(self, filename):
+        return self.client.storage.from_(self.bucket).download(filename)
+
+
+class LocalFeedbackSource:
+    """Stand-in for Supabase: ``<root>/feedback.jsonl`` rows and ``<root>/images/<image_filename>``."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def fetch_rows(self, since=None):
+        path = os.path.join(self.root, "feedback.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        if since:
+            rows = [r for r in rows if (r.get("timestamp") or "") >= since]
+        return sorted(rows, key=lambda r: r.get("timestamp") or "")
+
+    def download(self, filename):
+        path = os.path.join(self.root, "images", filename)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def row_key(row):
+    """Identity of a feedback row: its ``feedback_id``, or the image name for rows from before it existed."""
+    return row.get("feedback_id") or row.get("image_filename")
+
+
+def row_landmarks(row):
+    """The raw ``(63,)`` landmarks submitted with a row, or None if it has none (or they are malformed)."""
+    values = row.get("landmarks")
+    if not values or len(values) != RAW_FEATURES:
+        return None
+    try:
+        return np.asarray(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+
+
+def dedup_key(raw, label, step=DEDUP_STEP):
+    """Near-duplicate key of one sample: its label and its quantized pose."""
+    # normalize_features drops the wrist, so landmark i sits at row i - 1
+    pts = normalize_features(raw).reshape(N_LANDMARKS - 1, 3)[[i - 1 for i in DEDUP_LANDMARKS], :2]
+    cells = np.round(pts / step).astype(np.int16)
+    return f"{int(label)}:{cells.tobytes().hex()}"
+
+
+def sync_start(mark, overlap=SYNC_OVERLAP):
+    """The ``since`` a sync fetches from: ``overlap`` seconds before the high-water ``mark`` (None: everything)."""
+    if not mark:
+        return None
+    try:
+        return (datetime.fromisoformat(mark) - timedelta(seconds=overlap)).isoformat()
+    except ValueError:
+        return mark
+
+
+def _as_label(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def priority(row):
+    """How much retraining stands to learn from a row: a corrected prediction, then model uncertainty."""
+    predicted = _as_label(row.get("predicted_label"))
+    disagrees = predicted is not None and predicted != _as_label(row.get("correct_label"))
+    proba = row.get("probabilities")
+    # Unknown confidence ranks between sure and unsure rows
+    uncertainty = 1.0 - max(proba) if proba else 0.5
+    return DISAGREEMENT_WEIGHT * disagrees + uncertainty
+
+
+def decode_image(data):
+    """JPEG/PNG bytes -> BGR array, without touching the filesystem."""
+    import cv2
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+class FeedbackStore:
+    def __init__(self, dataset, root=FEEDBACK_STORE_DIR):
+        self.dataset = dataset
+        self.root = root
+        self.filenames_file = os.path.join(root, "filenames.txt")
+        self.keys_file = os.path.join(root, "dedup_keys.txt")
+        self.state_file = os.path.join(root, "state.json")
+        self.deferred_file = os.path.join(root, "deferred.jsonl")
+        self.filenames = []
+        self.high_water_mark = None
+        if os.path.exists(self.filenames_file):
+            with open(self.filenames_file) as f:
+                self.filenames = f.read().split()
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                self.high_water_mark = json.load(f).get("high_water_mark")
+        self._keys = set()
+        if os.path.exists(self.keys_file):
+            with open(self.keys_file) as f:
+                self._keys = set(f.read().split())
+        # Rows already handled, including those where no hand was found
+        self._seen = set(self.filenames)
+        self._seen.update(self._load_skipped())
+
+    def _load_skipped(self):
+        if not os.path.exists(self.state_file):
+            return []
+        with open(self.state_file) as f:
+            return json.load(f).get("skipped", [])
+
+    def _load_deferred(self):
+        """Rows a previous sync deferred (or could not download), to be ranked again."""
+        if not os.path.exists(self.deferred_file):
+            return []
+        with open(self.deferred_file) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def _is_duplicate(self, raw, label, batch_keys):
+        key = dedup_key(raw, label)
+        if key in self._keys or key in batch_keys:
+            return True
+        batch_keys.add(key)
+        return False
+
+    def sync(self, source, workers=DOWNLOAD_WORKERS, max_rows=MAX_SYNC_ROWS, overlap=SYNC_OVERLAP):
+        """Ingest up to ``max_rows`` of the most informative new feedback rows; returns the number of samples added."""
+        rows = source.fetch_rows(sync_start(self.high_water_mark, overlap))
+        # Rows left over from earlier syncs come first; a row fetched again is only taken once
+        candidates = {}
+        for row in self._load_deferred() + rows:
+            key = row_key(row)
+            if row.get("correct_label") and key and key not in self._seen:
+                candidates[key] = row
+        new_rows = sorted(candidates.values(), key=lambda r: r.get("timestamp") or "")
+        stamps = [r["timestamp"] for r in rows if r.get("timestamp")]
+        if stamps:
+            # Rows from the overlap window are older than the mark: never move it back
+            self.high_water_mark = max(stamps + [self.high_water_mark or ""])
+        if not new_rows:
+            self._save_state()
+            return 0
+
+        new_X, new_y, new_names, skipped, failed = [], [], [], [], []
+        image_rows, batch_keys = [], set()
+        duplicates, deferred = 0, []
+        # Stable sort: equal priorities keep their timestamp order
+        for row in sorted(new_rows, key=priority, reverse=True):
+            if len(new_X) + len(image_rows) >= max_rows:
+                deferred.append(row)
+                continue
+            raw = row_landmarks(row)
+            if raw is not None:
+                if self._is_duplicate(raw, row["correct_label"], batch_keys):
+                    # Not remembered: the persisted keys catch it again cheaply
+                    duplicates += 1
+                    continue
+                new_X.append(raw)
+                new_y.append(int(row["correct_label"]))
+                new_names.append(row_key(row))
+            elif row.get("image_filename"):
+                image_rows.append(row)
+            else:
+                skipped.append(row_key(row))
+        if image_rows:
+            before = len(new_X)
+            self._extract_images(source, image_rows, workers, new_X, new_y, new_names, skipped, failed)
+            # Image rows are only comparable once their landmarks are known
+            keep = list(range(before))
+            for i in range(before, len(new_X)):
+                if self._is_duplicate(new_X[i], new_y[i], batch_keys):
+                    duplicates += 1
+                    # Remembered, so the image is not downloaded again
+                    skipped.append(new_names[i])
+                else:
+                    keep.append(i)
+            new_X, new_y, new_names = ([v[i] for i in keep] for v in (new_X, new_y, new_names))
+        if duplicates:
+            print(f"🧹 Left out {duplicates} near-duplicate feedback rows")
+        if deferred:
+            print(f"⏭️  Deferred {len(deferred)} lower-priority feedback rows to the next sync")
+        if failed:
+            print(f"⚠️  {len(failed)} feedback images could not be downloaded; they will be retried")
+
+        os.makedirs(self.root, exist_ok=True)
+        if new_X:
+            self.dataset.append(np.array(new_X), np.array(new_y), source=f"feedback:{self.high_water_mark}")
+            with open(self.filenames_file, "a") as f:
+                f.writelines(name + "\n" for name in new_names)
+            self.filenames += new_names
+            with open(self.keys_file, "a") as f:
+                f.writelines(key + "\n" for key in sorted(batch_keys))
+            self._keys |= batch_keys
+        self._seen.update(new_names)
+        self._seen.update(skipped)
+        self._save_state(skipped, deferred + failed)
+        return len(new_X)
+
+    def _extract_images(self, source, rows, workers, new_X, new_y, new_names, skipped, failed):
+        """Download ``rows``' images and run MediaPipe on them, appending to the given lists."""
+        print(f"⬇️  Downloading {len(rows)} feedback images without landmarks...")
+        from hand_detector import HandDetector
+
+        def fetch(row):
+            try:
+                return source.download(row["image_filename"])
+            except Exception as e:
+                print(f"⚠️  Failed to download {row['image_filename']}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool, \
+                HandDetector(static_image_mode=True, max_num_hands=1) as detector:
+            downloads = pool.map(fetch, rows)
+            for row, data in zip(rows, downloads):
+                image = decode_image(data) if data else None
+                landmarks = detector.process(image, draw=False) if image is not None else None
+                if landmarks:
+                    new_X.append(landmarks_to_features(landmarks))
+                    new_y.append(int(row["correct_label"]))
+                    new_names.append(row_key(row))
+                elif data:
+                    # Downloaded fine but no hand in it: never fetch it again
+                    skipped.append(row_key(row))
+                else:
+                    failed.append(row)
+
+    def _save_state(self, skipped=(), deferred=()):
+        """Write the mark and skipped rows, and replace the deferred rows with ``deferred``."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.deferred_file + ".tmp"
+        with open(tmp, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in deferred)
+        os.replace(tmp, self.deferred_file)
+        state = {
+            "high_water_mark": self.high_water_mark,
+            "skipped": sorted(set(self._load_skipped()) | set(skipped)),
+        }
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.state_file)
@@ -0,0 +1,263 @@
+"""Background upload of feedback submissions.
+
+``UploadQueue.submit`` only writes the submission to a spool directory on
+local disk and returns; a worker thread uploads it later. Each spooled entry
+is an image file plus a JSON file. The JSON is written last, atomically, so
+a crash never leaves a half-written entry behind. Entries survive restarts
+and are retried with exponential backoff until they go through:
+
+1. the image is uploaded (once; the entry remembers it),
+2. rows whose images are up are inserted in batches of up to ``batch_size``;
+   if a batch fails, its rows are retried one by one, so one bad row does
+   not hold back the others,
+3. the entry is deleted.
+
+An entry that has failed ``max_attempts`` times is moved to ``failed/`` in
+the spool directory, with its last error, for someone to look at (move it
+back to retry).
+
+The row ``timestamp`` is set at insert time (UTC), not at submit time, so
+rows that were held back by an outage still land above the retrain job's
+high-water mark. An insert that is slow or retried can still commit after a
+later one, which is why every sync re-reads ``SYNC_OVERLAP`` below the mark
+(see ``feedback_store.FeedbackStore``).
+
+Sinks are pluggable. ``SupabaseFeedbackSink`` writes to the real bucket and
+table. ``LocalFeedbackSink`` writes the layout ``LocalFeedbackSource`` reads,
+so the whole feedback loop can run without Supabase.
+"""
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+FEEDBACK_SPOOL_DIR = "data/feedback_spool"
+BATCH_SIZE = 20
+BASE_DELAY = 2.0
+MAX_DELAY = 300.0
+# About an hour and a half of retries at MAX_DELAY
+MAX_ATTEMPTS = 25
+FAILED_DIR = "failed"
+
+
+class SupabaseFeedbackSink:
+    def __init__(self, client, bucket="feedback-images", table="feedback"):
+        self.client = client
+        self.bucket = bucket
+        self.table = table
+
+    def upload_image(self, filename, data, content_type):
+        # upsert: a retry after a lost response must not fail on "already exists"
+        self.client.storage.from_(self.bucket).upload(
+            filename, data, {"content-type": content_type, "upsert": "true"})
+
+    def insert_rows(self, rows):
+        self.client.table(self.table).insert(rows).execute()
+
+
+class LocalFeedbackSink:
+    """Writes ``<root>/feedback.jsonl`` and ``<root>/images/`` (read back by ``LocalFeedbackSource``)."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "images"), exist_ok=True)
+
+    def upload_image(self, filename, data, content_type):
+        path = os.path.join(self.root, "images", filename)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def insert_rows(self, rows):
+        with open(os.path.join(self.root, "feedback.jsonl"), "a") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in rows))
+
+
+def pending_uploads(spool_dir=FEEDBACK_SPOOL_DIR):
+    """Entries waiting in ``spool_dir``, without starting a queue (or connecting a sink) for it."""
+    if not os.path.isdir(spool_dir):
+        return 0
+    return sum(1 for name in os.listdir(spool_dir) if name.endswith(".json"))
+
+
+def _write_json(path, obj):
+    with open(path + ".tmp", "w") as f:
+        json.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+
+class UploadQueue:
+    def __init__(self, sink, spool_dir=FEEDBACK_SPOOL_DIR, batch_size=BATCH_SIZE,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, max_attempts=MAX_ATTEMPTS):
+        self.sink = sink
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        os.makedirs(spool_dir, exist_ok=True)
+        self._wake = threading.Event()
+        self._stop = False
+        # Entries left over from a previous run are picked up on the first pass
+        self._thread = threading.Thread(target=self._run, name="feedback-upload", daemon=True)
+        self._thread.start()
+
+    def submit(self, row, image=None, ext=".jpg"):
+        """Spool one feedback row (plus optional encoded image bytes) and return its entry id.
+
+        The row gets a unique ``feedback_id`` and, if there is an image, an
+        ``image_filename`` derived from it. The upload happens in the background.
+        """
+        entry_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+        entry = {"row": dict(row, feedback_id=entry_id), "attempts": 0, "next_attempt": 0.0,
+                 "image_uploaded": image is None}
+        if image is not None:
+            entry["image"] = f"feedback_{entry_id}{ext}"
+            entry["row"]["image_filename"] = entry["image"]
+            with open(os.path.join(self.spool_dir, entry["image"]), "wb") as f:
+                f.write(image)
+        _write_json(os.path.join(self.spool_dir, entry_id + ".json"), entry)
+        self._wake.set()
+        return entry_id
+
+    def pending(self):
+        """Number of submissions not uploaded yet."""
+        return pending_uploads(self.spool_dir)
+
+    def flush(self, timeout=10.0):
+        """Wake the worker and wait (up to ``timeout``) until the spool is empty; returns True if it is."""
+        deadline = time.monotonic() + timeout
+        while self.pending():
+            if time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.05)
+        return True
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+
+    # -- worker ---------------------------------------------------------------
+
+    def _entries(self):
+        entries = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with open(path) as f:
+                    entries.append((path, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def _backoff(self, path, entry, error):
+        entry["attempts"] += 1
+        if entry["attempts"] >= self.max_attempts:
+            self._give_up(path, entry, error)
+            return
+        delay = min(self.max_delay, self.base_delay * 2 ** (entry["attempts"] - 1))
+        # Jitter so many queued entries do not retry in lockstep
+        entry["next_attempt"] = time.time() + delay * random.uniform(0.5, 1.0)
+        entry["last_error"] = str(error)
+        _write_json(path, entry)
+
+    def _give_up(self, path, entry, error):
+        """Move an entry (and its image) out of the queue into ``failed/``."""
+        print(f"❌ Giving up on feedback {entry['row'].get('feedback_id')} after {entry['attempts']} attempts: {error}")
+        failed_dir = os.path.join(self.spool_dir, FAILED_DIR)
+        os.makedirs(failed_dir, exist_ok=True)
+        entry["last_error"] = str(error)
+        if entry.get("image"):
+            image_path = os.path.join(self.spool_dir, entry["image"])
+            if os.path.exists(image_path):
+                os.replace(image_path, os.path.join(failed_dir, entry["image"]))
+        _write_json(os.path.join(failed_dir, os.path.basename(path)), entry)
+        os.remove(path)
+
+    def _remove(self, path, entry):
+        os.remove(path)
+        if entry.get("image"):
+            image_path = os.path.join(self.spool_dir, entry["image"])
+            if os.path.exists(image_path):
+                os.remove(image_path)
+
+    def _insert(self, batch):
+        """Insert ``batch`` in one call, or row by row if that fails; uploaded entries are removed."""
+        inserted_at = datetime.now(timezone.utc).isoformat()
+        try:
+            self.sink.insert_rows([dict(entry["row"], timestamp=inserted_at) for _, entry in batch])
+        except Exception as e:
+            print(f"⚠️  Feedback insert of {len(batch)} rows failed: {e}")
+            if len(batch) == 1:
+                self._backoff(*batch[0], e)
+                return
+            # Find the row(s) at fault instead of holding back the whole batch
+            for item in batch:
+                self._insert([item])
+            return
+        for path, entry in batch:
+            self._remove(path, entry)
+
+    def _pass(self):
+        """Upload everything that is due; returns seconds until the next entry is due (or None)."""
+        now = time.time()
+        ready = []
+        for path, entry in self._entries():
+            if entry["next_attempt"] > now:
+                continue
+            if not entry["image_uploaded"]:
+                image_path = os.path.join(self.spool_dir, entry["image"])
+                try:
+                    with open(image_path, "rb") as f:
+                        data = f.read()
+                    content_type = "image/png" if entry["image"].endswith(".png") else "image/jpeg"
+                    self.sink.upload_image(entry["image"], data, content_type)
+                except Exception as e:
+                    print(f"⚠️  Feedback image upload failed (attempt {entry['attempts'] + 1}): {e}")
+                    self._backoff(path, entry, e)
+                    continue
+                entry["image_uploaded"] = True
+                _write_json(path, entry)
+            ready.append((path, entry))
+
+        for i in range(0, len(ready), self.batch_size):
+            self._insert(ready[i:i + self.batch_size])
+
+        # Whatever is left failed or was backing off already
+        left = [entry["next_attempt"] for _, entry in self._entries()]
+        return max(0.0, min(left) - time.time()) if left else None
+
+    def _run(self):
+        while not self._stop:
+            # Cleared before the pass, so a submit during it triggers another one right away
+            self._wake.clear()
+            try:
+                wait = self._pass()
+            except Exception as e:
+                print(f"⚠️  Feedback upload pass failed: {e}")
+                wait = self.base_delay
+            self._wake.wait(timeout=wait)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def upload_queue(make_sink, spool_dir=FEEDBACK_SPOOL_DIR):
+    """Process-wide ``UploadQueue`` for ``spool_dir``.
+
+    ``make_sink`` is only called when the queue is created, so connecting to
+    the backend happens once, on first use.
+    """
+    spool_dir = os.path.abspath(spool_dir)
+    with _queues_lock:
+        if spool_dir not in _queues:
+            _queues[spool_dir] = UploadQueue(make_sink(), spool_dir)
+        return _queues[spool_dir]
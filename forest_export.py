@@ -0,0 +1,164 @@
+"""Flatten a fitted RandomForestClassifier into plain NumPy node arrays.
+
+sklearn's ``predict`` spends most of a one-row call on input validation and
+joblib dispatch. The exported ``.npz`` holds every tree's nodes in a few
+contiguous arrays, and ``FlatForest`` walks all trees at once, one level per
+step. For a single sample every node's split is evaluated up front in one
+vectorised compare, which leaves one ``np.take`` per tree level.
+
+Run as a script to export an existing model and check it against sklearn:
+
+    python forest_export.py model/hand_cricket1.pkl
+"""
+import os
+import sys
+
+import numpy as np
+
+from features import build_features, schema_for
+
+BASE_DATASET_FILE = "data/handcricket_landmarks.npz"
+
+
+def flat_path(model_path):
+    """``model/foo.pkl`` -> ``model/foo.npz``"""
+    return os.path.splitext(model_path)[0] + ".npz"
+
+
+def is_forest(clf):
+    """True for fitted tree ensembles that ``export_forest`` can flatten."""
+    return hasattr(clf, "estimators_") and all(hasattr(est, "tree_") for est in clf.estimators_)
+
+
+def export_forest(clf, path):
+    """Write the trees of ``clf`` to ``path`` as contiguous node arrays."""
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in clf.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        leaf = tree.children_left < 0
+        node_ids = np.arange(n, dtype=np.int32) + offset
+
+        # Leaves point at themselves so every tree can be stepped the same number of times
+        left = np.where(leaf, node_ids, tree.children_left + offset)
+        right = np.where(leaf, node_ids, tree.children_right + offset)
+        children.append(np.stack([left, right], axis=1).astype(np.int32))
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(leaf, 0.0, tree.threshold))
+
+        value = tree.value[:, 0, :].astype(np.float64)
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(
+        path,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        children=np.ascontiguousarray(np.concatenate(children)),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        classes=np.asarray(clf.classes_),
+        max_depth=np.int32(max_depth),
+        n_features=np.int32(clf.n_features_in_),
+    )
+
+
+class FlatForest:
+    """Array-backed stand-in for a fitted RandomForestClassifier (predict / predict_proba)."""
+
+    def __init__(self, feature, threshold, children, value, roots, classes, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self._left = np.ascontiguousarray(children[:, 0])
+        self._right = np.ascontiguousarray(children[:, 1])
+        # sklearn compares float32 features against float64 thresholds. For a float32 x,
+        # x > t exactly when x > (the largest float32 <= t), so compare in float32 instead
+        threshold32 = threshold.astype(np.float32)
+        too_high = threshold32 > threshold
+        threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        self._threshold32 = threshold32
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{k: data[k] for k in data.files})
+
+    def _leaves(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[0] == 1:
+            # Single row: the next node of every node in every tree at once, then one
+            # level per step (leaves point at themselves, so extra steps are no-ops)
+            step = np.where(np.take(X[0], self.feature) > self._threshold32, self._right, self._left)
+            nodes = self.roots
+            for _ in range(self.max_depth):
+                nodes = np.take(step, nodes)
+            return nodes[None, :]
+
+        # Batches: evaluating every node for every row would cost rows x nodes, so only
+        # the current node of each (row, tree) is evaluated, still one level per step
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            go_right = X[rows, self.feature[nodes]] > self._threshold32[nodes]
+            nodes = np.where(go_right, self._right[nodes], self._left[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self._leaves(X)
+        # Summed over trees in order, then averaged, exactly as sklearn does
+        return self.value[leaves].sum(axis=1) / leaves.shape[1]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_classifier(model_path):
+    """Load the flat export next to ``model_path`` if it is up to date, else the pickled model."""
+    npz_path = flat_path(model_path)
+    if os.path.exists(npz_path) and (
+        not os.path.exists(model_path) or os.path.getmtime(npz_path) >= os.path.getmtime(model_path)
+    ):
+        return FlatForest.load(npz_path)
+    # joblib (and sklearn, through the unpickle) only when there is no flat export to serve
+    import joblib
+    return joblib.load(model_path)
+
+
+def check_parity(clf, flat, X):
+    """Number of rows where the flat predictor disagrees with ``clf.predict``."""
+    return int(np.count_nonzero(clf.predict(X) != flat.predict(X)))
+
+
+def export_and_verify(clf, model_path, dataset_file=BASE_DATASET_FILE):
+    """Export ``clf`` next to ``model_path`` and make sure it predicts exactly like sklearn."""
+    npz_path = flat_path(model_path)
+    export_forest(clf, npz_path)
+    if os.path.exists(dataset_file):
+        with np.load(dataset_file) as data:
+            X = build_features(data["X"], schema_for(clf))
+        mismatches = check_parity(clf, FlatForest.load(npz_path), X)
+        if mismatches:
+            os.remove(npz_path)
+            raise RuntimeError(f"Flat forest disagrees with sklearn on {mismatches}/{len(X)} samples")
+    return npz_path
+
+
+if __name__ == "__main__":
+    import joblib
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "model/hand_cricket1.pkl"
+    npz_path = export_and_verify(joblib.load(model_path), model_path)
+    print(f"✅ Flat forest exported to {npz_path}")
@@ -0,0 +1,160 @@
+"""Incremental random-forest updates: grow trees on new data, retire the weakest.
+
+A full refit costs time in proportion to the whole dataset. ``update_forest``
+keeps the trees of the current model and instead:
+
+1. grows ``new_trees`` trees on the rows added since that model was trained
+   (at most ``recent_max`` of them) plus a random replay sample of older rows,
+   so the new trees still see every class, plus ``augment_copies`` augmented
+   copies of those rows (see ``augment``);
+2. tags them with a new generation number (``forest.tree_generation_``);
+3. scores every tree on the selection rows and, while the forest is larger
+   than ``max_trees``, drops the worst tree (the oldest one on ties).
+
+Every step is bounded by these sizes, not by the dataset, so a retrain takes
+about the same time whether the store holds ten thousand rows or a million.
+
+Two sets of rows are kept out of training, by row number, so neither changes
+as the append-only dataset grows:
+
+* the holdout, every ``HOLDOUT_EVERY``-th row from row 0, which measures
+  accuracy (and from which ``evaluation``'s fixed promotion holdout is cut);
+* the selection rows, every ``HOLDOUT_EVERY``-th row from ``SELECTION_OFFSET``,
+  which pick the trees to retire. They are separate from the holdout, so the
+  holdout does not score a forest on the rows its trees were chosen by.
+
+Neither incremental trees nor full refits that use ``split_holdout`` train on
+either set.
+"""
+import numpy as np
+
+from augment import augment_dataset
+from features import build_features
+
+HOLDOUT_EVERY = 10
+HOLDOUT_MAX = 5000
+SELECTION_OFFSET = 5
+NEW_TREES = 25
+MAX_TREES = 150
+RECENT_MAX = 5000
+REPLAY_SAMPLES = 5000
+
+
+def split_holdout(n, every=HOLDOUT_EVERY, max_rows=HOLDOUT_MAX):
+    """``(train_idx, holdout_idx)`` for ``n`` rows; the holdout keeps its most recent ``max_rows`` rows.
+
+    The training rows also leave out the selection rows (see ``selection_rows``).
+    """
+    holdout = np.arange(0, n, every)
+    selection = np.arange(SELECTION_OFFSET, n, every)
+    train = np.setdiff1d(np.arange(n), np.concatenate([holdout, selection]), assume_unique=True)
+    return train, holdout[-max_rows:]
+
+
+def selection_rows(n, every=HOLDOUT_EVERY, max_rows=HOLDOUT_MAX):
+    """Rows that decide which trees ``retire`` drops (the most recent ``max_rows`` of them)."""
+    return np.arange(SELECTION_OFFSET, n, every)[-max_rows:]
+
+
+def tree_scores(forest, X, y, n_jobs=-1):
+    """Accuracy of each tree of ``forest`` on ``(X, y)``."""
+    from joblib import Parallel, delayed
+
+    # Trees predict class indices, not labels
+    y_idx = np.searchsorted(forest.classes_, y)
+    X = np.asarray(X, dtype=np.float32)
+    # Tree prediction releases the GIL, so threads are enough
+    scores = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(lambda tree: float(np.mean(tree.predict(X) == y_idx)))(tree) for tree in forest.estimators_
+    )
+    return np.array(scores)
+
+
+def generations(forest):
+    gen = getattr(forest, "tree_generation_", None)
+    if gen is None or len(gen) != len(forest.estimators_):
+        return np.zeros(len(forest.estimators_), dtype=np.int64)
+    return np.asarray(gen, dtype=np.int64)
+
+
+def grow(forest, X, y, n_trees=NEW_TREES, seed=None, n_jobs=-1):
+    """Fit ``n_trees`` trees on ``(X, y)`` and append them to ``forest`` as a new generation."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    if not np.array_equal(np.unique(y), forest.classes_):
+        raise ValueError("New trees must be trained on every class of the forest")
+    new = RandomForestClassifier(n_estimators=n_trees, random_state=seed, n_jobs=n_jobs,
+                                 **{k: v for k, v in forest.get_params().items()
+                                    if k in ("criterion", "max_depth", "min_samples_split", "min_samples_leaf",
+                                             "max_features", "class_weight")})
+    new.fit(X, y)
+
+    gen = generations(forest)
+    forest.estimators_ = list(forest.estimators_) + list(new.estimators_)
+    forest.tree_generation_ = np.concatenate([gen, np.full(n_trees, gen.max(initial=0) + 1)])
+    forest.n_estimators = len(forest.estimators_)
+    # The merged forest has no out-of-bag estimate; accuracy comes from the holdout instead
+    forest.oob_score = False
+    for attr in ("oob_score_", "oob_decision_function_"):
+        if hasattr(forest, attr):
+            delattr(forest, attr)
+    return forest
+
+
+def retire(forest, X_select, y_select, max_trees=MAX_TREES, n_jobs=-1):
+    """Drop the worst trees (oldest first on ties) until at most ``max_trees`` remain; returns how many went."""
+    excess = len(forest.estimators_) - max_trees
+    if excess <= 0:
+        return 0
+    scores = tree_scores(forest, X_select, y_select, n_jobs)
+    gen = generations(forest)
+    # lexsort: last key is primary -> lowest score, then lowest generation
+    drop = set(np.lexsort((gen, scores))[:excess].tolist())
+    keep = [i for i in range(len(forest.estimators_)) if i not in drop]
+    forest.estimators_ = [forest.estimators_[i] for i in keep]
+    forest.tree_generation_ = gen[keep]
+    forest.n_estimators = len(forest.estimators_)
+    return excess
+
+
+def update_forest(forest, X_raw, y, schema, trained_rows, seed=None, new_trees=NEW_TREES,
+                  max_trees=MAX_TREES, recent_max=RECENT_MAX, replay=REPLAY_SAMPLES, augment_copies=0, n_jobs=-1):
+    """Grow ``forest`` on rows from ``trained_rows`` on and retire its weakest trees.
+
+    ``X_raw`` may be a memmap of the whole landmark store: only the rows that are
+    actually used are read and featurized. Returns ``(forest, report)``.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(y)
+    train_idx, holdout_idx = split_holdout(n)
+
+    recent = train_idx[train_idx >= max(trained_rows, n - recent_max)]
+    older = train_idx[train_idx < recent[0]] if len(recent) else train_idx
+    sample = rng.choice(older, size=min(replay, len(older)), replace=False) if len(older) else older
+    fit_idx = np.sort(np.concatenate([recent, sample]))
+    # A class missing from the sample (rare) still needs a few rows for the new trees
+    for label in np.setdiff1d(forest.classes_, y[fit_idx]):
+        extra = train_idx[y[train_idx] == label][:50]
+        fit_idx = np.union1d(fit_idx, extra)
+
+    X_fit, y_fit = augment_dataset(X_raw[fit_idx], y[fit_idx], augment_copies, seed)
+    grow(forest, build_features(X_fit, schema), y_fit, new_trees, seed, n_jobs)
+
+    select_idx = selection_rows(n)
+    retired = retire(forest, build_features(X_raw[select_idx], schema), y[select_idx], max_trees, n_jobs)
+    X_hold = build_features(X_raw[holdout_idx], schema)
+    accuracy = float(np.mean(forest.predict(X_hold) == y[holdout_idx]))
+
+    report = {
+        "recent_rows": int(len(recent)),
+        "replay_rows": int(len(fit_idx) - len(recent)),
+        "augmented_rows": int(len(y_fit) - len(fit_idx)),
+        "holdout_rows": int(len(holdout_idx)),
+        "selection_rows": int(len(select_idx)),
+        "new_trees": new_trees,
+        "retired_trees": retired,
+        "n_trees": len(forest.estimators_),
+        "generation": int(generations(forest).max(initial=0)),
+        "holdout_accuracy": accuracy,
+    }
+    return forest, report
@@ -0,0 +1,81 @@
+"""UI-free hand cricket rules.
+
+``Match`` is the whole state of one game and ``play_ball`` applies one ball.
+The Streamlit page keeps a ``Match`` in session state and only renders what
+it reports; ``simulate.py`` plays the same rules in bulk.
+
+Rules: the player bats first and scores their number on every ball until
+both numbers match (out). The bot then bats with the player's score as the
+target: the player wins if the bot is out short of it, it is a tie if the bot
+is out exactly on it, and the bot wins as soon as it passes it.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+PLAYER, BOT, END = "player", "bot", "end"
+WIN, LOSE, TIE = "win", "lose", "tie"
+
+
+@dataclass
+class BallResult:
+    player_num: int
+    bot_num: int
+    runs: int
+    out: bool
+    # Set on the ball that finishes the match
+    result: Optional[str] = None
+
+
+@dataclass
+class Match:
+    batting: str = PLAYER
+    player_score: int = 0
+    bot_score: int = 0
+    # True once the current innings is over (until the next innings starts)
+    out: bool = False
+    last_player_num: Optional[int] = None
+    last_bot_num: Optional[int] = None
+    result: Optional[str] = None
+
+    @property
+    def target(self):
+        """Runs the bot needs to win (only meaningful while the bot bats)."""
+        return self.player_score + 1
+
+    def play_ball(self, player_num, bot_num):
+        if self.out or self.batting == END:
+            raise RuntimeError("The innings is over; start the next one first")
+        self.last_player_num = player_num
+        self.last_bot_num = bot_num
+
+        if self.batting == PLAYER:
+            if player_num == bot_num:
+                self.out = True
+                return BallResult(player_num, bot_num, 0, True)
+            self.player_score += player_num
+            return BallResult(player_num, bot_num, player_num, False)
+
+        if player_num == bot_num:
+            self.out = True
+            self.batting = END
+            self.result = TIE if self.player_score == self.bot_score else WIN
+            return BallResult(player_num, bot_num, 0, True, self.result)
+
+        self.bot_score += bot_num
+        if self.player_score < self.bot_score:
+            self.out = True
+            self.batting = END
+            self.result = LOSE
+            return BallResult(player_num, bot_num, bot_num, False, self.result)
+        return BallResult(player_num, bot_num, bot_num, False)
+
+    def end_player_innings(self):
+        """Player is out: hand the bat to the bot (the bot innings starts with ``start_bot_innings``)."""
+        self.batting = BOT
+
+    def start_bot_innings(self):
+        self.batting = BOT
+        self.bot_score = 0
+        self.out = False
+        self.last_player_num = None
+        self.last_bot_num = None
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class GestureVoter:
+    """Accumulates per-frame class probabilities over a capture window.
+
+    ``add`` returns a label as soon as the averaged probability of the leading
+    class reaches ``min_confidence`` and that class has led for
+    ``min_stable_frames`` consecutive frames. If the window closes first,
+    ``best`` gives the strongest vote seen so far.
+    """
+
+    def __init__(self, classes, min_confidence=0.6, min_stable_frames=3):
+        self.classes = np.asarray(classes)
+        self.min_confidence = min_confidence
+        self.min_stable_frames = min_stable_frames
+        self._sum = np.zeros(len(self.classes), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._sum[:] = 0.0
+        self.frames = 0
+        self._leader = -1
+        self._streak = 0
+
+    def add(self, proba):
+        """Add one frame's probabilities; return the committed label or None."""
+        self._sum += proba
+        self.frames += 1
+        leader = int(np.argmax(proba))
+        self._streak = self._streak + 1 if leader == self._leader else 1
+        self._leader = leader
+
+        top = int(np.argmax(self._sum))
+        confidence = self._sum[top] / self.frames
+        if (top == leader and self._streak >= self.min_stable_frames
+                and confidence >= self.min_confidence):
+            return self.classes[top].item()
+        return None
+
+    def best(self):
+        """Label with the highest averaged probability, or None if no frame was added."""
+        if self.frames == 0:
+            return None
+        return self.classes[int(np.argmax(self._sum))].item()
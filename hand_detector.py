@@ -0,0 +1,188 @@
+import threading
+import time
+
+import cv2
+
+# MediaPipe's hand skeleton (same pairs as ``mp.solutions.hands.HAND_CONNECTIONS``), kept here so
+# drawing landmarks does not need MediaPipe in processes that never run the tracker
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+def _solutions():
+    """``mediapipe.solutions``, imported on first use (the import alone takes about a second)."""
+    import mediapipe as mp
+    return mp.solutions
+
+
+class HandDetector:
+    """Long-lived MediaPipe Hands tracker.
+
+    Building a ``Hands`` graph is far more expensive than running it, and in
+    video mode (``static_image_mode=False``) the graph keeps tracking state
+    between calls, so one detector should live for a whole game or stream
+    instead of being recreated for every frame.
+
+    In video mode the graph only sees a small image: while a hand is tracked,
+    a square crop around it (padded by ``roi_margin`` of its size) shrunk to at
+    most ``roi_size`` pixels; after a miss, the whole frame shrunk to
+    ``search_width``. Landmarks are mapped back to full-frame coordinates, so
+    callers never see the crop. Static mode always uses the frame as is.
+
+    The graph tracks the hand in the coordinates of the image it saw last, so
+    the crop stays put while the hand is well inside it, and whenever the view
+    changes (full frame <-> crop, or the crop is moved) the graph is reset and
+    finds the hand with palm detection again.
+    """
+
+    def __init__(self, static_image_mode=False, max_num_hands=1,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5, monitor=None,
+                 track_roi=True, roi_margin=0.5, roi_size=256, search_width=640):
+        self.static_image_mode = static_image_mode
+        self.track_roi = track_roi and not static_image_mode
+        self.roi_margin = roi_margin
+        self.roi_size = roi_size
+        self.search_width = search_width
+        # Last hand bounding box (x0, y0, x1, y1) in full-frame normalized coordinates
+        self._box = None
+        # What the graph saw last: (left, top, side) of the crop in frame pixels, or None for the full frame
+        self._view = None
+        # Optional perf.PerfMonitor; records the colour conversion and the graph run separately
+        self.monitor = monitor
+        self._options = dict(
+            static_image_mode=static_image_mode,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+        self._hands = _solutions().hands.Hands(**self._options)
+        # A graph is not safe to drive from two threads at once
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _crop(self, frame):
+        """Image to run the graph on, plus its ``(x0, y0, w, h)`` in frame pixels."""
+        h, w = frame.shape[:2]
+        view = None if self._box is None else self._window(w, h)
+        if view != self._view:
+            self._reset_graph()
+            self._view = view
+        if view is None:
+            if self.monitor is not None:
+                self.monitor.count("detect_full_search")
+            return _shrink(frame, self.search_width), (0, 0, w, h)
+        left, top, side = view
+        return _shrink(frame[top:top + side, left:left + side], self.roi_size), (left, top, side, side)
+
+    def _window(self, w, h):
+        """``(left, top, side)`` crop for the current box: the last one while the hand is well inside it."""
+        x0, y0, x1, y1 = self._box[0] * w, self._box[1] * h, self._box[2] * w, self._box[3] * h
+        size = max(x1 - x0, y1 - y0)
+        if self._view is not None:
+            left, top, side = self._view
+            pad = size * self.roi_margin / 2
+            # Edges on the frame border cannot move any further, so a hand there still counts as inside
+            inside = ((x0 - pad >= left or left == 0) and (x1 + pad <= left + side or left + side == w)
+                      and (y0 - pad >= top or top == 0) and (y1 + pad <= top + side or top + side == h))
+            # Re-centre when the hand shrank so much that the crop wastes most of its pixels
+            if inside and size * (1 + 2 * self.roi_margin) >= side / 2:
+                return self._view
+
+        # Square around the hand so a turned hand still fits
+        side = int(min(size * (1 + 2 * self.roi_margin), w, h))
+        left = int(min(max((x0 + x1) / 2 - side / 2, 0), w - side))
+        top = int(min(max((y0 + y1) / 2 - side / 2, 0), h - side))
+        return left, top, side
+
+    def _reset_graph(self):
+        """Drop the graph's tracking state (it refers to the previous view's coordinates)."""
+        if self.monitor is not None:
+            self.monitor.count("detect_graph_reset")
+        with self._lock:
+            if self.closed:
+                return
+            if hasattr(self._hands, "reset"):
+                self._hands.reset()
+            else:
+                self._hands.close()
+                self._hands = _solutions().hands.Hands(**self._options)
+
+    def process(self, frame, draw=True):
+        """Run the tracker on a BGR frame and return the first hand's landmarks (or None).
+
+        When ``draw`` is set the landmarks are drawn onto ``frame`` in place.
+        """
+        t0 = time.perf_counter()
+        if self.track_roi:
+            image, (left, top, cw, ch) = self._crop(frame)
+        else:
+            image = frame
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        t1 = time.perf_counter()
+        with self._lock:
+            if self.closed:
+                return None
+            results = self._hands.process(rgb)
+        if self.monitor is not None:
+            self.monitor.record("detect_cvtColor", t1 - t0)
+            self.monitor.record("detect_hands", time.perf_counter() - t1)
+        if not results.multi_hand_landmarks:
+            # Lost the hand: search the whole frame next time
+            self._box = None
+            return None
+        landmarks = results.multi_hand_landmarks[0]
+        if self.track_roi:
+            h, w = frame.shape[:2]
+            _to_frame(landmarks, left / w, top / h, cw / w, ch / h)
+            xs = [lm.x for lm in landmarks.landmark]
+            ys = [lm.y for lm in landmarks.landmark]
+            self._box = (min(xs), min(ys), max(xs), max(ys))
+        if draw:
+            solutions = _solutions()
+            solutions.drawing_utils.draw_landmarks(frame, landmarks, solutions.hands.HAND_CONNECTIONS)
+        return landmarks
+
+    def close(self):
+        with self._lock:
+            if not self.closed:
+                self._hands.close()
+                self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def draw_landmarks(frame, raw):
+    """Draw raw ``(63,)`` landmarks (as returned by the inference service) onto a BGR frame."""
+    h, w = frame.shape[:2]
+    pts = [(int(raw[i] * w), int(raw[i + 1] * h)) for i in range(0, len(raw), 3)]
+    for a, b in HAND_CONNECTIONS:
+        cv2.line(frame, pts[a], pts[b], (224, 224, 224), 2)
+    for p in pts:
+        cv2.circle(frame, p, 2, (0, 0, 255), 2)
+
+
+def _shrink(image, size):
+    """Downscale ``image`` so its longer side is at most ``size`` (uniformly, so normalized coordinates hold)."""
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def _to_frame(landmarks, x0, y0, sx, sy):
+    """Map normalized crop coordinates back to the full frame, in place."""
+    for lm in landmarks.landmark:
+        lm.x = x0 + lm.x * sx
+        lm.y = y0 + lm.y * sy
+        # z shares the scale of x
+        lm.z = lm.z * sx
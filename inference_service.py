@@ -0,0 +1,423 @@
+"""Shared hand inference for every session in the process.
+
+Each game session and feedback stream used to run MediaPipe and the
+classifier on its own thread, all contending for one GIL. ``InferenceService``
+moves detection into a pool of worker processes and classifies in batches:
+
+* A session is pinned to one worker (the least loaded when it opens). That
+  worker keeps a video-mode ``HandDetector`` for it, so tracking state and
+  the hand ROI carry over from frame to frame.
+* Frames reach the workers through one shared-memory buffer per session, not
+  through pickles.
+* A session has at most one frame in flight. A frame submitted while another
+  is still waiting replaces it, and the stale frame's future is cancelled.
+  Workers also drop frames that waited longer than ``max_age``. Queues
+  therefore never hold more than one frame per session, however busy the
+  server gets.
+* A collector thread gathers worker results while more are due, for at most
+  ``batch_wait`` seconds. It then runs one ``predict_proba`` per model over
+  all of them.
+
+    service = inference_service("model")
+    session = service.open_session()
+    result = session.infer(frame)     # InferenceResult, or None if shed
+    session.close()
+"""
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import CancelledError, Future, TimeoutError
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+import numpy as np
+
+from features import build_features, landmarks_to_features, schema_for
+from model_registry import MODEL_DIR, live_model
+from perf import get_monitor
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Seconds between checks for crashed detector processes
+WORKER_CHECK_INTERVAL = 1.0
+
+_STALE = "stale"
+
+
+@dataclass
+class InferenceResult:
+    # Raw (63,) landmarks in full-frame coordinates, None when no hand was found
+    landmarks: Optional[np.ndarray]
+    proba: Optional[np.ndarray]
+    classes: Optional[np.ndarray]
+    # Registry version of the live model that classified it (None for a pinned model)
+    model_version: Optional[int] = None
+
+    @property
+    def label(self):
+        return None if self.proba is None else int(self.classes[int(np.argmax(self.proba))])
+
+
+class _FrameTimings:
+    """Stands in for a ``PerfMonitor`` inside a worker: collects one frame's stage timings and counters,
+    which travel back with its result and are recorded into the parent's ``inference`` monitor."""
+
+    def __init__(self):
+        self.records = []
+        self.counts = {}
+
+    def record(self, stage, seconds):
+        self.records.append((stage, seconds))
+
+    def count(self, counter, n=1):
+        self.counts[counter] = self.counts.get(counter, 0) + n
+
+    def drain(self):
+        records, counts = self.records, self.counts
+        self.records, self.counts = [], {}
+        return records, counts
+
+
+def _worker_main(requests, results, max_age):
+    """Detector process: one tracker per session, fed through ``requests``."""
+    from hand_detector import HandDetector
+
+    detectors = {}
+    buffers = {}
+    timings = _FrameTimings()
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+        if msg[0] == "close":
+            detector = detectors.pop(msg[1], None)
+            if detector is not None:
+                detector.close()
+            shm = buffers.pop(msg[1], None)
+            if shm is not None:
+                shm.close()
+            continue
+
+        _, sid, seq, shm_name, shape, submitted = msg
+        if time.monotonic() - submitted > max_age:
+            results.put((sid, seq, _STALE, 0.0, None))
+            continue
+        shm = buffers.get(sid)
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = buffers[sid] = SharedMemory(name=shm_name)
+        detector = detectors.get(sid)
+        if detector is None:
+            detector = detectors[sid] = HandDetector(static_image_mode=False, max_num_hands=1, monitor=timings)
+
+        start = time.perf_counter()
+        try:
+            landmarks = detector.process(np.ndarray(shape, np.uint8, shm.buf), draw=False)
+            raw = landmarks_to_features(landmarks) if landmarks else None
+        except Exception as e:
+            raw = e
+        results.put((sid, seq, raw, time.perf_counter() - start, timings.drain()))
+
+    for detector in detectors.values():
+        detector.close()
+    for shm in buffers.values():
+        shm.close()
+
+
+class _SessionState:
+    def __init__(self, sid, worker):
+        self.id = sid
+        self.worker = worker
+        self.shm = None
+        self.seq = 0
+        # (seq, future, clf, submitted) of the frame at the worker
+        self.in_flight = None
+        # (frame copy, future, clf) waiting for the in-flight one to finish
+        self.pending = None
+
+
+class InferenceSession:
+    """One camera stream's handle on the service.
+
+    Closed explicitly with ``close()``, or when the handle is garbage collected
+    (e.g. with the Streamlit session that held it).
+    """
+
+    def __init__(self, service, sid):
+        self.service = service
+        self.id = sid
+        self._finalizer = weakref.finalize(self, service._close_session, sid)
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def submit(self, frame, clf=None):
+        """Queue a BGR frame; the future resolves to an ``InferenceResult``.
+
+        ``clf`` pins the classifier (e.g. for one turn of the game); by default
+        the service's live model at classification time is used.
+        """
+        return self.service._submit(self.id, frame, clf)
+
+    def infer(self, frame, clf=None, timeout=2.0):
+        """``submit`` and wait; None when the frame was shed or took too long."""
+        try:
+            return self.submit(frame, clf).result(timeout)
+        except (CancelledError, TimeoutError):
+            return None
+
+    def close(self):
+        self._finalizer()
+
+
+class InferenceService:
+    def __init__(self, model_dir=MODEL_DIR, workers=DEFAULT_WORKERS, batch_wait=0.005,
+                 max_batch=64, max_age=0.5):
+        self.models = live_model(model_dir)
+        self.batch_wait = batch_wait
+        self.max_batch = max_batch
+        self.monitor = get_monitor("inference")
+
+        self.max_age = max_age
+
+        # Spawned, not forked: the parent runs threads (Streamlit, WebRTC) and MediaPipe dislikes forks
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._requests = [self._ctx.Queue() for _ in range(workers)]
+        self._procs = [self._start_worker(i) for i in range(workers)]
+
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._load = [0] * workers
+        self._ids = itertools.count(1)
+        self._in_flight = 0
+        self.closed = False
+        self._collector = threading.Thread(target=self._collect, name="inference-collector", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, i):
+        p = self._ctx.Process(target=_worker_main, args=(self._requests[i], self._results, self.max_age),
+                              name=f"inference-worker-{i}", daemon=True)
+        p.start()
+        return p
+
+    def _check_workers(self):
+        """Restart dead detector processes and fail the frames they were holding."""
+        for i, p in enumerate(self._procs):
+            if p.is_alive() or self.closed:
+                continue
+            self.monitor.count("worker_restarts")
+            with self._lock:
+                # A process killed inside ``get`` can leave its queue's lock held: start over with a new one
+                self._requests[i] = self._ctx.Queue()
+                self._procs[i] = self._start_worker(i)
+                for session in self._sessions.values():
+                    if session.worker == i and session.in_flight is not None:
+                        self._in_flight -= 1
+                        session.in_flight[1].set_exception(CancelledError())
+                        session.in_flight = None
+                        if session.pending is not None:
+                            frame, future, clf = session.pending
+                            session.pending = None
+                            self._dispatch(session, frame, future, clf)
+
+    # -- sessions -----------------------------------------------------------
+
+    def open_session(self):
+        with self._lock:
+            worker = self._load.index(min(self._load))
+            self._load[worker] += 1
+            sid = next(self._ids)
+            self._sessions[sid] = _SessionState(sid, worker)
+        return InferenceSession(self, sid)
+
+    def _close_session(self, sid):
+        with self._lock:
+            session = self._sessions.pop(sid, None)
+            if session is None:
+                return
+            self._load[session.worker] -= 1
+            if session.pending is not None:
+                session.pending[1].cancel()
+                session.pending = None
+            if session.in_flight is not None:
+                self._in_flight -= 1
+                session.in_flight[1].set_exception(CancelledError())
+                session.in_flight = None
+            if not self.closed:
+                self._requests[session.worker].put(("close", sid))
+            shm, session.shm = session.shm, None
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    # -- requests -----------------------------------------------------------
+
+    def _submit(self, sid, frame, clf):
+        future = Future()
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is None or self.closed:
+                future.cancel()
+                return future
+            if session.in_flight is None:
+                self._dispatch(session, frame, future, clf)
+            else:
+                if session.pending is not None:
+                    # Newer frame wins; nobody wants the old one any more
+                    session.pending[1].cancel()
+                    self.monitor.count("shed")
+                session.pending = (frame.copy(), future, clf)
+        return future
+
+    def _dispatch(self, session, frame, future, clf):
+        """Copy ``frame`` into the session buffer and send it to the worker (lock held)."""
+        if not future.set_running_or_notify_cancel():
+            return
+        if session.shm is None or session.shm.size < frame.nbytes:
+            if session.shm is not None:
+                session.shm.close()
+                session.shm.unlink()
+            session.shm = SharedMemory(create=True, size=frame.nbytes)
+        np.copyto(np.ndarray(frame.shape, np.uint8, session.shm.buf), frame)
+        session.seq += 1
+        submitted = time.monotonic()
+        session.in_flight = (session.seq, future, clf, submitted)
+        self._in_flight += 1
+        self._requests[session.worker].put(
+            ("frame", session.id, session.seq, session.shm.name, frame.shape, submitted))
+
+    # -- results ------------------------------------------------------------
+
+    def _collect(self):
+        next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+        while True:
+            # On a timer, not only when idle: other sessions' results can keep the queue busy forever
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+            self.monitor.maybe_export()
+            try:
+                item = self._results.get(timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                if self.closed:
+                    return
+                continue
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            # Wait for stragglers only while other frames are actually at the workers
+            while len(batch) < min(self._in_flight, self.max_batch):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._results.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._finish(batch)
+                    return
+                batch.append(item)
+            self._finish(batch)
+
+    def _finish(self, batch):
+        done = []
+        with self._lock:
+            for sid, seq, raw, detect_time, stages in batch:
+                # The worker's own stages (colour conversion, graph run, full-frame searches)
+                if stages is not None:
+                    records, counts = stages
+                    for stage, seconds in records:
+                        self.monitor.record(stage, seconds)
+                    for counter, n in counts.items():
+                        self.monitor.count(counter, n)
+                session = self._sessions.get(sid)
+                if session is None or session.in_flight is None or session.in_flight[0] != seq:
+                    continue
+                _, future, clf, submitted = session.in_flight
+                session.in_flight = None
+                self._in_flight -= 1
+                self.monitor.record("roundtrip", time.monotonic() - submitted)
+                if isinstance(raw, str):  # _STALE
+                    self.monitor.count("shed")
+                    future.set_exception(CancelledError())
+                elif isinstance(raw, Exception):
+                    future.set_exception(raw)
+                else:
+                    self.monitor.record("detect", detect_time)
+                    self.monitor.tick()
+                    done.append((future, clf, raw))
+                if session.pending is not None:
+                    frame, next_future, next_clf = session.pending
+                    session.pending = None
+                    self._dispatch(session, frame, next_future, next_clf)
+
+        # One predict_proba per model over every hand in the batch
+        groups = {}
+        for future, clf, raw in done:
+            if raw is None:
+                future.set_result(InferenceResult(None, None, None))
+                continue
+            version = None
+            if clf is None:
+                clf = self.models.get()
+                version = (self.models.info or {}).get("version")
+            groups.setdefault(id(clf), (clf, version, []))[2].append((future, raw))
+        for clf, version, items in groups.values():
+            try:
+                with self.monitor.stage("classify_batch"):
+                    X = build_features(np.stack([raw for _, raw in items]), schema_for(clf))
+                    proba = clf.predict_proba(X)
+            except Exception as e:
+                for future, _ in items:
+                    future.set_exception(e)
+                continue
+            self.monitor.count("classified", len(items))
+            for (future, raw), p in zip(items, proba):
+                future.set_result(InferenceResult(raw, p, clf.classes_, version))
+        self.monitor.count("batches")
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            sids = list(self._sessions)
+        for sid in sids:
+            self._close_session(sid)
+        for q in self._requests:
+            q.put(None)
+        for p in self._procs:
+            p.join(timeout=5)
+        self._results.put(None)
+        self._collector.join(timeout=5)
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def inference_service(model_dir=MODEL_DIR, workers=DEFAULT_WORKERS):
+    """Process-wide ``InferenceService`` for ``model_dir``, started on first use."""
+    model_dir = os.path.abspath(model_dir)
+    with _services_lock:
+        if model_dir not in _services:
+            _services[model_dir] = InferenceService(model_dir, workers)
+        return _services[model_dir]
+
+
+@atexit.register
+def _shutdown():
+    with _services_lock:
+        services = list(_services.values())
+    for service in services:
+        service.close()
@@ -0,0 +1,185 @@
+"""Parallel, cached landmark extraction for ``dataset/<label>/`` image folders.
+
+Images are fanned out to a process pool where every worker owns one
+static-mode ``HandDetector``. Results are cached by the SHA-1 of the image
+bytes, so a rerun after collecting new images only runs MediaPipe on the new
+files (renamed or moved images are still cache hits).
+
+``append_images`` uses the same hashes to append only the images the landmark
+store does not have yet.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from features import RAW_FEATURES, landmarks_to_features
+
+DATASET_DIR = "dataset"
+CACHE_FILE = "data/landmark_cache.npz"
+OUTPUT_FILE = "data/handcricket_landmarks.npz"
+
+# Landmarks of an image count as a hashless seed row when every coordinate is this close
+# (MediaPipe builds differ in the last digits), and at least this share of the seed must
+# be found among the images before anything is appended next to it
+SEED_MATCH_ATOL = 1e-4
+MIN_SEED_MATCH = 0.5
+
+_detector = None
+
+
+def _init_worker():
+    global _detector
+    from hand_detector import HandDetector
+    _detector = HandDetector(static_image_mode=True, max_num_hands=1)
+
+
+def _extract(path):
+    """Worker: landmarks for one image file, or a NaN row when no hand is found."""
+    import cv2
+    image = cv2.imread(path)
+    if image is not None:
+        landmarks = _detector.process(image, draw=False)
+        if landmarks:
+            return landmarks_to_features(landmarks)
+    return np.full(RAW_FEATURES, np.nan, dtype=np.float32)
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_cache(cache_file=CACHE_FILE):
+    """``{sha1: features}``; rows of NaN mark images where no hand was detected."""
+    if not os.path.exists(cache_file):
+        return {}
+    with np.load(cache_file) as data:
+        return dict(zip(data["hashes"].tolist(), data["X"]))
+
+
+def save_cache(cache, cache_file=CACHE_FILE):
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    hashes = list(cache)
+    X = np.stack([cache[h] for h in hashes]) if hashes else np.empty((0, RAW_FEATURES), np.float32)
+    tmp = cache_file + ".tmp.npz"
+    np.savez(tmp, hashes=np.array(hashes), X=X)
+    os.replace(tmp, cache_file)
+
+
+def list_images(dataset_dir=DATASET_DIR):
+    """``[(path, label), ...]`` for every file under ``dataset_dir/<label>/``."""
+    items = []
+    for label in sorted(os.listdir(dataset_dir)):
+        label_dir = os.path.join(dataset_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for img_file in sorted(os.listdir(label_dir)):
+            items.append((os.path.join(label_dir, img_file), int(label)))
+    return items
+
+
+def extract_dataset(dataset_dir=DATASET_DIR, cache_file=CACHE_FILE, workers=None):
+    """Landmarks for every image in ``dataset_dir``, as ``(X, y)`` float32/int64 arrays.
+
+    Only images whose content hash is not cached yet are sent to the pool.
+    """
+    X, y, _ = extract_rows(dataset_dir, cache_file, workers)
+    return X, y
+
+
+def extract_rows(dataset_dir=DATASET_DIR, cache_file=CACHE_FILE, workers=None):
+    """``(X, y, hashes)`` for every image in which a hand was found."""
+    items = list_images(dataset_dir)
+    hashes = [file_hash(path) for path, _ in items]
+    cache = load_cache(cache_file)
+
+    pending = {}
+    for (path, _), h in zip(items, hashes):
+        if h not in cache and h not in pending:
+            pending[h] = path
+
+    if pending:
+        print(f"🔍 Extracting landmarks from {len(pending)} new images ({len(items) - len(pending)} cached)...")
+        paths = list(pending.values())
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            chunksize = max(1, len(paths) // (workers * 4))
+            for h, features in zip(pending, pool.map(_extract, paths, chunksize=chunksize)):
+                cache[h] = features
+        save_cache(cache, cache_file)
+    else:
+        print(f"✅ All {len(items)} images already cached")
+
+    X, y, found = [], [], []
+    for (_, label), h in zip(items, hashes):
+        features = cache[h]
+        if not np.isnan(features[0]):
+            X.append(features)
+            y.append(label)
+            found.append(h)
+    X = np.array(X, dtype=np.float32).reshape(-1, RAW_FEATURES)
+    return X, np.array(y, dtype=np.int64), found
+
+
+def match_seed(X, y, seed_X, seed_y, atol=SEED_MATCH_ATOL, chunk=256):
+    """``(matched, seed_found)``: which rows of ``X`` are within ``atol`` of a seed row with the same label,
+    and how many seed rows were some row's nearest match."""
+    X = np.asarray(X, dtype=np.float32)
+    seed_X = np.asarray(seed_X, dtype=np.float32)
+    seed_y = np.asarray(seed_y)
+    matched = np.zeros(len(X), dtype=bool)
+    found = np.zeros(len(seed_X), dtype=bool)
+    for label in np.unique(y):
+        rows, candidates = np.flatnonzero(y == label), np.flatnonzero(seed_y == label)
+        if not len(candidates):
+            continue
+        for start in range(0, len(rows), chunk):
+            block = rows[start:start + chunk]
+            # Largest coordinate difference to every seed row of the label
+            dist = np.abs(X[block, None, :] - seed_X[None, candidates, :]).max(axis=2)
+            nearest = dist.argmin(axis=1)
+            close = dist[np.arange(len(block)), nearest] <= atol
+            matched[block[close]] = True
+            found[candidates[nearest[close]]] = True
+    return matched, int(found.sum())
+
+
+def append_images(dataset, dataset_dir=DATASET_DIR, cache_file=CACHE_FILE, workers=None):
+    """Append the images in ``dataset_dir`` that ``dataset`` does not have yet; returns how many rows were added.
+
+    A store seeded from an ``.npz`` without hashes (older extractions) has no
+    record of its images: those whose landmarks match a seed row of the same
+    label within ``SEED_MATCH_ATOL`` count as already there. If fewer than
+    ``MIN_SEED_MATCH`` of the seed rows are found that way, the seed came from
+    other images or another MediaPipe build, and appending would store the
+    same hands twice (holdout rows included), so nothing is appended.
+    """
+    X, y, hashes = extract_rows(dataset_dir, cache_file, workers)
+    known = dataset.image_hashes()
+    if not known:
+        seeded = [i for i, seg in enumerate(dataset.segments) if seg["source"].startswith("seed:")]
+        if seeded:
+            seed_X = np.concatenate([dataset.segment_arrays(i)[0] for i in seeded])
+            seed_y = np.concatenate([dataset.segment_arrays(i)[1] for i in seeded])
+            matched, seed_found = match_seed(X, y, seed_X, seed_y)
+            if seed_found < MIN_SEED_MATCH * len(seed_y):
+                raise RuntimeError(
+                    f"Only {seed_found}/{len(seed_y)} seed rows of {dataset.root} match an image in {dataset_dir};"
+                    f" move it aside and rerun extract_landmark_from_dataset.py to reseed it from the images")
+            known = {h for h, m in zip(hashes, matched) if m}
+            dataset.add_image_hashes(sorted(known))
+
+    new = [i for i, h in enumerate(hashes) if h not in known]
+    # The same image may sit in several folders; append it once
+    new = list({hashes[i]: i for i in new}.values())
+    if new:
+        dataset.append(X[new], y[new], source=f"images:{dataset_dir}", image_hashes=[hashes[i] for i in new])
+    return len(new)
+
+
+def save_dataset(X, y, output_file=OUTPUT_FILE, hashes=None):
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    extra = {} if hashes is None else {"hashes": np.array(hashes)}
+    np.savez_compressed(output_file, X=X, y=y, **extra)
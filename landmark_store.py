@@ -0,0 +1,126 @@
+"""Append-only, memory-mapped landmark dataset.
+
+Layout of ``data/landmarks/``::
+
+    manifest.json   row count, dtypes and one entry per appended segment
+    X.f32           float32 rows of RAW_FEATURES values, back to back
+    y.i64           int64 labels
+    images.txt      SHA-1 of every ``dataset/`` image already appended
+
+Appending writes the new rows at the end of ``X.f32``/``y.i64`` and then
+atomically replaces the manifest, so nothing already on disk is rewritten or
+decompressed. Readers map the files with ``np.memmap`` and only see the rows
+the manifest vouches for, so a half-finished append is simply ignored (and
+overwritten by the next one).
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from features import RAW_FEATURES
+
+LANDMARK_STORE_DIR = "data/landmarks"
+BASE_DATASET_FILE = "data/handcricket_landmarks.npz"
+
+X_DTYPE = np.float32
+Y_DTYPE = np.int64
+
+
+class LandmarkDataset:
+    def __init__(self, root=LANDMARK_STORE_DIR, n_features=RAW_FEATURES):
+        self.root = root
+        self.manifest_file = os.path.join(root, "manifest.json")
+        self.x_file = os.path.join(root, "X.f32")
+        self.y_file = os.path.join(root, "y.i64")
+        self.images_file = os.path.join(root, "images.txt")
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"n_features": n_features, "rows": 0, "segments": []}
+
+    @property
+    def n_features(self):
+        return self.manifest["n_features"]
+
+    @property
+    def segments(self):
+        return self.manifest["segments"]
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def image_hashes(self):
+        """Hashes of the collected images whose rows are in the store (see ``landmark_extraction.append_images``)."""
+        if not os.path.exists(self.images_file):
+            return set()
+        with open(self.images_file) as f:
+            return set(f.read().split())
+
+    def append(self, X, y, source="", image_hashes=()):
+        """Append ``X`` (N, n_features) and ``y`` (N,) as a new segment; returns its index.
+
+        ``image_hashes`` are recorded as ingested once the rows are committed.
+        """
+        X = np.ascontiguousarray(X, dtype=X_DTYPE).reshape(-1, self.n_features)
+        y = np.ascontiguousarray(y, dtype=Y_DTYPE).reshape(-1)
+        if len(X) != len(y):
+            raise ValueError(f"X has {len(X)} rows but y has {len(y)}")
+
+        os.makedirs(self.root, exist_ok=True)
+        start = len(self)
+        for path, arr in ((self.x_file, X), (self.y_file, y)):
+            row_bytes = arr.strides[0]
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # Drop anything a crashed append left past the committed rows
+                f.truncate(start * row_bytes)
+                f.seek(start * row_bytes)
+                f.write(arr.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.manifest["segments"].append({
+            "source": source,
+            "start": start,
+            "rows": len(X),
+            "added": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+        self.manifest["rows"] = start + len(X)
+        tmp = self.manifest_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_file)
+        self.add_image_hashes(image_hashes)
+        return len(self.segments) - 1
+
+    def add_image_hashes(self, hashes):
+        if len(hashes):
+            with open(self.images_file, "a") as f:
+                f.writelines(h + "\n" for h in hashes)
+
+    def arrays(self):
+        """Read-only ``(X, y)`` memmaps over every committed row (no copy, no decompression)."""
+        rows = len(self)
+        if rows == 0:
+            return np.empty((0, self.n_features), X_DTYPE), np.empty(0, Y_DTYPE)
+        X = np.memmap(self.x_file, dtype=X_DTYPE, mode="r", shape=(rows, self.n_features))
+        y = np.memmap(self.y_file, dtype=Y_DTYPE, mode="r", shape=(rows,))
+        return X, y
+
+    def segment_arrays(self, index):
+        seg = self.segments[index]
+        X, y = self.arrays()
+        sl = slice(seg["start"], seg["start"] + seg["rows"])
+        return X[sl], y[sl]
+
+
+def open_dataset(root=LANDMARK_STORE_DIR, seed_file=BASE_DATASET_FILE):
+    """The landmark store, seeded from the preprocessed ``.npz`` the first time it is opened."""
+    dataset = LandmarkDataset(root)
+    if len(dataset) == 0 and os.path.exists(seed_file):
+        with np.load(seed_file) as data:
+            hashes = data["hashes"].tolist() if "hashes" in data.files else ()
+            dataset.append(data["X"], data["y"], source=f"seed:{seed_file}", image_hashes=hashes)
+    return dataset
@@ -0,0 +1,163 @@
+"""Versioned model artifacts and a hot-reloading loader shared by every page.
+
+Layout of ``model/``::
+
+    registry.json              {"current": 3, "versions": [{...metadata...}, ...]}
+    handcricket-v3.pkl         sklearn model as trained
+    handcricket-v3.npz         flat export used for inference (forests only, see forest_export)
+
+``publish_model`` writes a new version and then atomically repoints
+``registry.json``. ``LiveModel`` watches that file's mtime and swaps the new
+model in without a restart; callers grab ``get()`` once per turn (or frame)
+and keep that reference, so a swap never happens in the middle of one.
+Before anything is published the legacy ``model/*.pkl`` files are used.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from features import schema_for
+from forest_export import export_and_verify, is_forest, load_classifier
+
+MODEL_DIR = "model"
+REGISTRY_FILE = "registry.json"
+MODEL_NAME = "handcricket"
+KEEP_VERSIONS = 5
+# Newest first: the retrained feedback model wins over the baseline
+LEGACY_MODELS = ["handcricket_feedback.pkl", "hand_cricket1.pkl"]
+
+
+def read_registry(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, REGISTRY_FILE)
+    if not os.path.exists(path):
+        return {"current": None, "versions": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_registry(registry, model_dir):
+    path = os.path.join(model_dir, REGISTRY_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp, path)
+
+
+def version_info(registry, version):
+    for info in registry["versions"]:
+        if info["version"] == version:
+            return info
+    return None
+
+
+def publish_model(clf, model_dir=MODEL_DIR, **metadata):
+    """Save ``clf`` as the next version, make it current and return its metadata.
+
+    Extra keyword arguments (``n_samples``, ``accuracy``, ...) are stored as-is.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    registry = read_registry(model_dir)
+    version = max((v["version"] for v in registry["versions"]), default=0) + 1
+    model_file = f"{MODEL_NAME}-v{version}.pkl"
+    model_path = os.path.join(model_dir, model_file)
+
+    import joblib
+    joblib.dump(clf, model_path)
+    if is_forest(clf):
+        # Other models (kNN, linear) are served from the pickle as they are
+        export_and_verify(clf, model_path)
+
+    info = {
+        "version": version,
+        "file": model_file,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "model_type": type(clf).__name__,
+        "feature_schema": schema_for(clf),
+        "n_features": int(clf.n_features_in_),
+        **metadata,
+    }
+    registry["versions"].append(info)
+    registry["current"] = version
+
+    # Retire old artifacts, never the one being served
+    for old in registry["versions"][:-KEEP_VERSIONS]:
+        for path in (old["file"], os.path.splitext(old["file"])[0] + ".npz"):
+            full = os.path.join(model_dir, path)
+            if os.path.exists(full):
+                os.remove(full)
+    registry["versions"] = registry["versions"][-KEEP_VERSIONS:]
+
+    _write_registry(registry, model_dir)
+    return info
+
+
+def resolve_current(model_dir=MODEL_DIR):
+    """``(model_path, metadata)`` of the model that should be served right now."""
+    registry = read_registry(model_dir)
+    info = version_info(registry, registry["current"])
+    if info is not None:
+        return os.path.join(model_dir, info["file"]), info
+    for name in LEGACY_MODELS:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            return path, {"version": None, "file": name}
+    raise FileNotFoundError(f"No model found in {model_dir}/")
+
+
+def _stamp(model_dir):
+    """Changes whenever a new model is published (or a legacy model file is replaced)."""
+    paths = [os.path.join(model_dir, REGISTRY_FILE)] + [os.path.join(model_dir, n) for n in LEGACY_MODELS]
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+
+class LiveModel:
+    """Holds the current model and reloads it when the registry changes.
+
+    The file check is throttled to once per ``check_interval`` seconds, so
+    calling ``get()`` on every frame costs next to nothing.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, check_interval=5.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._model = None
+        self.info = None
+        self._stamp = None
+        self._last_check = 0.0
+        self.reload()
+
+    def reload(self):
+        stamp = _stamp(self.model_dir)
+        path, info = resolve_current(self.model_dir)
+        model = load_classifier(path)
+        with self._lock:
+            self._model, self.info, self._stamp = model, info, stamp
+            self._last_check = time.monotonic()
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if _stamp(self.model_dir) != self._stamp:
+                try:
+                    self.reload()
+                except Exception as e:
+                    # A half-written rollout must not take the game down; keep serving the old model
+                    print(f"⚠️  Model reload failed, keeping version {self.info.get('version')}: {e}")
+        return self._model
+
+
+_live_models = {}
+_live_lock = threading.Lock()
+
+
+def live_model(model_dir=MODEL_DIR):
+    """Process-wide ``LiveModel``, shared by every session and page."""
+    model_dir = os.path.abspath(model_dir)
+    with _live_lock:
+        if model_dir not in _live_models:
+            _live_models[model_dir] = LiveModel(model_dir)
+        return _live_models[model_dir]
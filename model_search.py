@@ -0,0 +1,197 @@
+"""Cross-validated model search that weighs accuracy against size and latency.
+
+Works on the cached landmark arrays (the ``data/landmarks`` store, seeded from
+``data/handcricket_landmarks.npz``), so no image is decoded and MediaPipe never
+runs. Candidates:
+
+* random forests over tree count, depth and feature schema (raw / normalized),
+* kNN with a KD-tree on normalized features,
+* logistic regression on normalized features.
+
+Every (candidate, fold) fit runs in parallel. Each candidate is then refit on
+all training rows and measured:
+
+* CV accuracy, and accuracy on the fixed holdout (``forest_update.split_holdout``),
+* size on disk (pickle, plus the flat ``.npz`` that forests are served from),
+* median latency of one single-row ``predict_proba`` in its served form, with
+  all candidates timed in turn, call by call (``evaluation.paired_latency``),
+  so their latencies are comparable.
+
+The pick is the fastest candidate whose CV accuracy is within ``--tolerance``
+of the best.
+
+    python model_search.py                          # search and report
+    python model_search.py --tolerance 0.005 --publish
+    python model_search.py --output bench/model_search.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from evaluation import paired_latency, served_form
+from features import build_features
+from forest_update import split_holdout
+from landmark_store import BASE_DATASET_FILE, LANDMARK_STORE_DIR, open_dataset
+
+CV_FOLDS = 5
+TOLERANCE = 0.01
+
+
+def candidates():
+    """Search space as ``(name, kind, params, schema)``."""
+    specs = []
+    for schema, n_trees, depth in itertools.product(("normalized", "raw"), (25, 50, 100), (None, 16, 10)):
+        specs.append((f"forest-{n_trees}-d{depth or 'max'}-{schema}", "forest",
+                      {"n_estimators": n_trees, "max_depth": depth}, schema))
+    for k in (1, 3, 5, 9):
+        specs.append((f"knn-{k}-normalized", "knn", {"n_neighbors": k}, "normalized"))
+    for c in (0.1, 1.0, 10.0):
+        specs.append((f"logreg-C{c}-normalized", "linear", {"C": c}, "normalized"))
+    return specs
+
+
+def build(kind, params, seed=0):
+    """Unfitted estimator for a candidate (single-threaded: the search parallelises across fits)."""
+    if kind == "forest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    if kind == "knn":
+        from sklearn.neighbors import KNeighborsClassifier
+        return KNeighborsClassifier(algorithm="kd_tree", weights="distance", **params)
+    if kind == "linear":
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+        return make_pipeline(StandardScaler(), LogisticRegression(max_iter=2000, **params))
+    raise ValueError(f"Unknown model kind: {kind}")
+
+
+def _fold_accuracy(kind, params, X, y, train, test):
+    model = build(kind, params).fit(X[train], y[train])
+    return float(np.mean(model.predict(X[test]) == y[test]))
+
+
+def search(X_raw, y, specs=None, folds=CV_FOLDS, n_jobs=-1, seed=0):
+    """Evaluate every candidate; returns ``(results, fitted models by name)``."""
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    specs = specs or candidates()
+    train_idx, holdout_idx = split_holdout(len(y))
+    features = {schema: build_features(X_raw, schema) for schema in {s[3] for s in specs}}
+    y_train = y[train_idx]
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=seed).split(train_idx, y_train))
+
+    jobs = [(spec, train, test) for spec in specs for train, test in splits]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_fold_accuracy)(kind, params, features[schema][train_idx], y_train, train, test)
+        for (_, kind, params, schema), train, test in jobs
+    )
+    finals = Parallel(n_jobs=n_jobs)(
+        delayed(lambda kind, params, X: build(kind, params).fit(X, y_train))(
+            kind, params, features[schema][train_idx])
+        for _, kind, params, schema in specs
+    )
+
+    results, models, served_models = [], {}, []
+    with tempfile.TemporaryDirectory() as workdir:
+        for i, ((name, kind, params, schema), model) in enumerate(zip(specs, finals)):
+            fold_scores = scores[i * folds:(i + 1) * folds]
+            X_hold = features[schema][holdout_idx]
+            served, pkl_bytes, npz_bytes = served_form(model, workdir, name)
+            served_models.append(served)
+            results.append({
+                "name": name,
+                "kind": kind,
+                "params": params,
+                "schema": schema,
+                "cv_accuracy": float(np.mean(fold_scores)),
+                "cv_std": float(np.std(fold_scores)),
+                "holdout_accuracy": float(np.mean(served.predict(X_hold) == y[holdout_idx])),
+                "pickle_bytes": pkl_bytes,
+                "flat_bytes": npz_bytes,
+            })
+            models[name] = model
+        for result, latency in zip(results, paired_latency(served_models, X_raw[holdout_idx], seed=seed)):
+            result["latency_us"] = latency
+    return results, models
+
+
+def select(results, tolerance=TOLERANCE):
+    """Fastest candidate within ``tolerance`` of the best CV accuracy (smaller on disk on ties)."""
+    best = max(r["cv_accuracy"] for r in results)
+    eligible = [r for r in results if r["cv_accuracy"] >= best - tolerance]
+    return min(eligible, key=lambda r: (r["latency_us"], r["flat_bytes"] or r["pickle_bytes"]))
+
+
+def print_report(results, chosen):
+    print(f"{'candidate':<28} {'cv acc':>7} {'± std':>6} {'holdout':>7} {'latency':>10} {'on disk':>9}")
+    for r in sorted(results, key=lambda r: -r["cv_accuracy"]):
+        size = (r["flat_bytes"] or r["pickle_bytes"]) / 1024
+        mark = " ⭐" if r is chosen else ""
+        print(f"{r['name']:<28} {r['cv_accuracy']:7.3f} {r['cv_std']:6.3f} {r['holdout_accuracy']:7.3f}"
+              f" {r['latency_us']:8.0f}µs {size:7.0f}KB{mark}")
+
+
+def load_arrays(data):
+    """``(X, y)`` from a ``.npz`` file or a landmark store directory."""
+    if data.endswith(".npz"):
+        with np.load(data) as d:
+            return d["X"], d["y"]
+    X, y = open_dataset(data, BASE_DATASET_FILE).arrays()
+    return np.asarray(X), np.asarray(y)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=LANDMARK_STORE_DIR, help="landmark store directory or .npz file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="accuracy the pick may give up against the best candidate")
+    parser.add_argument("--folds", type=int, default=CV_FOLDS)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--output", help="write every candidate's results as JSON here")
+    parser.add_argument("--publish", action="store_true", help="publish the pick as the next model version")
+    args = parser.parse_args(argv)
+
+    X, y = load_arrays(args.data)
+    print(f"📊 {len(y)} samples from {args.data}")
+    start = time.perf_counter()
+    results, models = search(X, y, folds=args.folds, n_jobs=args.jobs)
+    chosen = select(results, args.tolerance)
+    print(f"⏱️  Searched {len(results)} candidates in {time.perf_counter() - start:.1f} s")
+    print_report(results, chosen)
+    print(f"✅ Pick: {chosen['name']} (cv {chosen['cv_accuracy']:.3f}, {chosen['latency_us']:.0f} µs per frame)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"tolerance": args.tolerance, "chosen": chosen["name"], "results": results}, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.publish:
+        from model_registry import publish_model
+
+        # Only a model trained on the landmark store can be grown incrementally from its row offset
+        store = {} if args.data.endswith(".npz") else {"store_rows": len(y)}
+        info = publish_model(
+            models[chosen["name"]],
+            n_samples=len(y),
+            **store,
+            accuracy=round(chosen["holdout_accuracy"], 4),
+            cv_accuracy=round(chosen["cv_accuracy"], 4),
+            latency_us=round(chosen["latency_us"], 1),
+            candidate=chosen["name"],
+            trained_by="model_search.py",
+        )
+        print(f"🚀 Published as version {info['version']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,40 @@
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, VideoProcessorBase
 import av
-import cv2
-import numpy as np
-import mediapipe as mp
-import joblib
-from datetime import datetime
-import tempfile
-from supabase import create_client
 import os
+import time
+from inference_service import inference_service
+from feedback_upload import LocalFeedbackSink, SupabaseFeedbackSink, pending_uploads, upload_queue
+from perf import get_monitor, format_table
+from warmup import warm_up, INFERENCE as PREWARM_INFERENCE
 
 # -------------------------
 # Model & MediaPipe Loading
 # -------------------------
 current_dir = os.path.dirname(__file__)
-model_path = os.path.join(current_dir, '..', 'model', 'handcricket_feedback.pkl')
-MODEL_PATH = os.path.abspath(model_path)
-
-@st.cache_resource
-def load_model(path):
-    if os.path.exists(path):
-        try:
-            return joblib.load(path)
-        except Exception as e:
-            st.warning(f"Failed to load model ({path}): {e}")
-            return None
-    return None
-
-@st.cache_resource
-def get_mp_hands():
-    return mp.solutions.hands, mp.solutions.drawing_utils
-
-clf = load_model(MODEL_PATH)
-mp_hands, mp_drawing = get_mp_hands()
+MODEL_DIR = os.path.abspath(os.path.join(current_dir, '..', 'model'))
+
+# Same detector pool and batched classifier as the game, serving the same hot-swapped live model.
+# Created when the first stream starts (or by the warm-up after first paint), not on every rerun.
+
+# Per-stage latency for every stream in this process (dumped to logs/perf_feedback.json)
+perf = get_monitor("feedback")
 
 # -------------------------
-# Supabase Client
+# Feedback Upload Queue
 # -------------------------
-SUPABASE_URL = st.secrets["supabase_url"]
-SUPABASE_KEY = st.secrets["supabase_key"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Point this at a directory to collect feedback locally (read back by retrain_with_feedback.py)
+FEEDBACK_LOCAL_DIR = os.environ.get("FEEDBACK_LOCAL_DIR")
+
+def make_sink():
+    if FEEDBACK_LOCAL_DIR:
+        return LocalFeedbackSink(FEEDBACK_LOCAL_DIR)
+    from supabase import create_client
+    return SupabaseFeedbackSink(create_client(st.secrets["supabase_url"], st.secrets["supabase_key"]))
+
+# Submissions are spooled to disk and uploaded by a background thread, with retries
+def get_uploads():
+    return upload_queue(make_sink)
 
 # -------------------------
 # App State
@@ -49,6 +44,12 @@ if "last_frame" not in st.session_state:
     st.session_state.last_frame = None
 if "last_prediction" not in st.session_state:
     st.session_state.last_prediction = None
+if "last_result" not in st.session_state:
+    st.session_state.last_result = None
+
+# Optional feedback images are stored this wide (the landmarks are what training uses)
+FEEDBACK_IMAGE_WIDTH = 320
+FEEDBACK_IMAGE_QUALITY = 85
 
 # -------------------------
 # Video Processor
@@ -57,27 +58,45 @@ class HandProcessor(VideoProcessorBase):
     def __init__(self):
         self.pred = None
         self.frame = None
+        # (frame, InferenceResult) of the same moment, swapped in as one tuple for Capture Frame
+        self.latest = (None, None)
+        # One inference session (and worker-side tracker) per stream
+        self.inference = inference_service(MODEL_DIR).open_session()
 
     def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
-        img = frame.to_ndarray(format="bgr24")
-        self.frame = img.copy()
-
-        with mp_hands.Hands(static_image_mode=False, max_num_hands=1) as hands:
-            results = hands.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-            if results.multi_hand_landmarks:
-                landmarks = results.multi_hand_landmarks[0]
-                mp_drawing.draw_landmarks(img, landmarks, mp_hands.HAND_CONNECTIONS)
-                data = np.array([[lm.x, lm.y, lm.z] for lm in landmarks.landmark]).flatten().reshape(1, -1)
-                self.pred = int(clf.predict(data)[0])
-            else:
-                self.pred = None
+        import cv2
+        from hand_detector import draw_landmarks
+
+        start = time.perf_counter()
+        with perf.stage("decode"):
+            img = frame.to_ndarray(format="bgr24")
+            self.frame = img.copy()
+
+        with perf.stage("infer"):
+            result = self.inference.infer(img, timeout=1.0)
+        self.pred = result.label if result is not None else None
+        self.latest = (self.frame, result)
+        if result is not None and result.landmarks is not None:
+            draw_landmarks(img, result.landmarks)
+        elif result is not None:
+            perf.count("undetected")
+        else:
+            perf.count("shed")
 
         # Overlay text
         if self.pred is not None:
             cv2.putText(img, f"Pred: {self.pred}", (10, 40),
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
-        return av.VideoFrame.from_ndarray(img, format="bgr24")
+        with perf.stage("encode"):
+            out = av.VideoFrame.from_ndarray(img, format="bgr24")
+        perf.record("recv_total", time.perf_counter() - start)
+        perf.tick()
+        perf.maybe_export()
+        return out
+
+    def on_ended(self):
+        self.inference.close()
 
 
 # -------------------------
@@ -112,8 +131,16 @@ with col2:
         st.switch_page("app.py")
     if ctx.video_processor:
         if st.button("📸 Capture Frame"):
-            st.session_state.last_frame = ctx.video_processor.frame
-            st.session_state.last_prediction = ctx.video_processor.pred
+            frame, result = ctx.video_processor.latest
+            st.session_state.last_frame = frame
+            st.session_state.last_result = result
+            st.session_state.last_prediction = result.label if result is not None else None
+
+# Diagnostics panel (optional): refreshed on every rerun of this page
+if st.sidebar.toggle("Show diagnostics", value=False):
+    st.sidebar.markdown(format_table(perf.snapshot()))
+    st.sidebar.markdown(format_table(get_monitor("inference").snapshot()))
+    st.sidebar.button("Refresh", icon=":material/refresh:")
 
 
 # -------------------------
@@ -125,24 +152,42 @@ st.subheader("📤 Submit Feedback")
 if st.session_state.last_frame is not None:
     st.image(st.session_state.last_frame, channels="BGR", caption=f"Predicted: {st.session_state.last_prediction}")
     correct_label = st.selectbox("Correct Label (if wrong)", list(range(1, 11)))
+    result = st.session_state.last_result
+    has_landmarks = result is not None and result.landmarks is not None
+    # Without landmarks the image is all retraining has to go on
+    include_image = st.checkbox("Also send a small copy of the image", value=not has_landmarks,
+                                disabled=not has_landmarks)
 
     if st.button("Submit Feedback"):
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        fname = f"feedback_{ts}.jpg"
-        tmp_path = os.path.join(tempfile.gettempdir(), fname)
-        cv2.imwrite(tmp_path, st.session_state.last_frame)
-
-        # Upload image
-        with open(tmp_path, "rb") as f:
-            supabase.storage.from_("feedback-images").upload(fname, f)
-
-        # Upload metadata
-        supabase.table("feedback").insert({
-            "timestamp": datetime.now().isoformat(),
+        import cv2
+        row = {
             "predicted_label": st.session_state.last_prediction,
             "correct_label": correct_label,
-            "image_filename": fname
-        }).execute()
-
-        st.success("✅ Feedback submitted to Supabase!")
-        last_frame = None
\ No newline at end of file
+        }
+        if has_landmarks:
+            row["landmarks"] = [round(float(v), 5) for v in result.landmarks]
+            row["probabilities"] = [round(float(p), 4) for p in result.proba]
+            row["model_version"] = result.model_version
+        image = None
+        if include_image or not has_landmarks:
+            small = st.session_state.last_frame
+            h, w = small.shape[:2]
+            if w > FEEDBACK_IMAGE_WIDTH:
+                small = cv2.resize(small, (FEEDBACK_IMAGE_WIDTH, round(h * FEEDBACK_IMAGE_WIDTH / w)),
+                                   interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, FEEDBACK_IMAGE_QUALITY])
+            image = jpeg.tobytes()
+        get_uploads().submit(row, image)
+
+        st.success("✅ Feedback saved — thanks! It will be uploaded in the background.")
+        last_frame = None
+
+pending = pending_uploads()
+if pending:
+    st.caption(f"⏳ {pending} feedback submission(s) waiting to upload")
+
+# Page is out: start the upload queue (which also resumes leftover uploads)
+prewarm = {"uploads": get_uploads}
+if PREWARM_INFERENCE:
+    prewarm["inference"] = lambda: inference_service(MODEL_DIR)
+warm_up("feedback", **prewarm)
@@ -0,0 +1,138 @@
+"""Lightweight hot-path timers for the game loop and the feedback stream.
+
+Each stage keeps its last ``window`` durations in a ring buffer, so recording
+is one ``perf_counter`` pair and a deque append; percentiles are only computed
+when a snapshot is taken. One ``PerfMonitor`` per pipeline is shared by every
+session in the process (``get_monitor``) and can be dumped to JSON for
+capacity tuning on shared hosts.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+PERF_DIR = os.environ.get("HANDCRICKET_PERF_DIR", "logs")
+EXPORT_INTERVAL = 10.0
+
+
+class PerfMonitor:
+    def __init__(self, name, window=500):
+        self.name = name
+        self.window = window
+        self._stages = {}
+        self._counters = {}
+        self._frame_times = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._stages.get(stage)
+            if samples is None:
+                samples = self._stages[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+    def tick(self):
+        """Mark one processed frame (drives the effective FPS figure)."""
+        with self._lock:
+            self._frame_times.append(time.monotonic())
+            self._counters["frames"] = self._counters.get("frames", 0) + 1
+
+    def fps(self):
+        with self._lock:
+            times = list(self._frame_times)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def snapshot(self):
+        """Per-stage count / mean / p50 / p95 / p99 in milliseconds, counters and FPS."""
+        with self._lock:
+            stages = {name: np.array(samples) * 1000.0 for name, samples in self._stages.items()}
+            counters = dict(self._counters)
+        summary = {}
+        for name, ms in stages.items():
+            if len(ms) == 0:
+                continue
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            summary[name] = {
+                "count": len(ms),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+            }
+        return {
+            "name": self.name,
+            "time": time.time(),
+            "fps": round(self.fps(), 2),
+            "counters": counters,
+            "stages": summary,
+        }
+
+    def export(self, path=None):
+        path = path or os.path.join(PERF_DIR, f"perf_{self.name}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def maybe_export(self, interval=EXPORT_INTERVAL):
+        """Export at most once per ``interval`` seconds; cheap to call every frame."""
+        now = time.monotonic()
+        if now - self._last_export >= interval:
+            self._last_export = now
+            try:
+                self.export()
+            except OSError:
+                pass
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._frame_times.clear()
+
+
+def format_table(snapshot):
+    """Markdown table of a snapshot, for the sidebar diagnostics panel."""
+    lines = [
+        f"**{snapshot['name']}** · {snapshot['fps']:.1f} FPS · "
+        + " · ".join(f"{k}: {v}" for k, v in sorted(snapshot["counters"].items())),
+        "",
+        "| stage | p50 ms | p95 ms | n |",
+        "|---|---:|---:|---:|",
+    ]
+    for name, s in snapshot["stages"].items():
+        lines.append(f"| {name} | {s['p50_ms']:.2f} | {s['p95_ms']:.2f} | {s['count']} |")
+    return "\n".join(lines)
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(name):
+    """Process-wide monitor for one pipeline (``"game"``, ``"feedback"``, ...)."""
+    with _monitors_lock:
+        if name not in _monitors:
+            _monitors[name] = PerfMonitor(name)
+        return _monitors[name]
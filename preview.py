@@ -0,0 +1,50 @@
+"""Bandwidth-capped webcam preview for a Streamlit placeholder.
+
+Inference keeps using full-resolution frames; only the copy sent to the
+browser is shrunk to ``width`` and JPEG-encoded once, straight from BGR (no
+colour conversion, no lossless re-encode in Streamlit). Pushes are capped at a
+fixed ``fps``. ``placeholder.image`` only queues the message, so how long it
+takes says nothing about the client; the fixed rate is what bounds the
+bandwidth.
+"""
+import time
+
+import cv2
+
+
+class PreviewPublisher:
+    def __init__(self, placeholder, fps=15, width=480, quality=70, monitor=None):
+        self.placeholder = placeholder
+        self.interval = 1.0 / fps
+        self.width = width
+        self.quality = quality
+        self.monitor = monitor
+        self._next_due = 0.0
+
+    def encode(self, frame):
+        h, w = frame.shape[:2]
+        if w > self.width:
+            frame = cv2.resize(frame, (self.width, round(h * self.width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buf.tobytes() if ok else None
+
+    def push(self, frame, force=False):
+        """Send ``frame`` (BGR) unless it is too soon; returns True if it was sent."""
+        now = time.monotonic()
+        if not force and now < self._next_due:
+            if self.monitor is not None:
+                self.monitor.count("preview_skipped")
+            return False
+
+        t0 = time.perf_counter()
+        data = self.encode(frame)
+        t1 = time.perf_counter()
+        if data is not None:
+            self.placeholder.image(data)
+        t2 = time.perf_counter()
+        if self.monitor is not None:
+            self.monitor.record("preview_encode", t1 - t0)
+            self.monitor.record("preview_push", t2 - t1)
+
+        self._next_due = now + self.interval
+        return True
@@ -1,71 +1,142 @@
+import json
 import os
-import cv2
+import time
 import numpy as np
-import mediapipe as mp
 from sklearn.ensemble import RandomForestClassifier
-import joblib
-from supabase import create_client
-import tempfile
+from augment import augment_dataset
+from evaluation import load_holdout, promotion_report
+from features import build_features, schema_for
+from feedback_store import FeedbackStore, LocalFeedbackSource, SupabaseFeedbackSource, FEEDBACK_STORE_DIR
+from forest_update import split_holdout, update_forest
+from landmark_store import open_dataset
+from model_registry import publish_model, resolve_current
 
 # === CONFIG ===
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_KEY"]
 BUCKET_NAME = "feedback-images"
-MODEL_OUTPUT = "model/handcricket_feedback.pkl"
 BASE_DATASET_FILE = "data/handcricket_landmarks.npz"  # Preprocessed landmarks
+LANDMARK_STORE_DIR = "data/landmarks"  # Append-only store: base dataset + feedback
+FEATURE_SCHEMA = "normalized"  # or "raw" for image-relative landmarks
+MAX_FEEDBACK_ROWS = 2000  # most informative new feedback rows ingested per run (see feedback_store)
+AUGMENT_COPIES = 2  # augmented copies of each training sample (see augment.py); 0 to turn off
+# Point this at a directory with feedback.jsonl + images/ to retrain without Supabase
+FEEDBACK_LOCAL_DIR = os.environ.get("FEEDBACK_LOCAL_DIR")
+# "incremental": grow the current forest on new rows and retire its weakest trees (see forest_update)
+# "full": fit a fresh forest on everything
+RETRAIN_MODE = os.environ.get("RETRAIN_MODE", "incremental")
+# The candidate is only published if it does not regress on the fixed holdout (see evaluation.gate)
+PROMOTION_REPORT = os.environ.get("PROMOTION_REPORT", "logs/promotion.json")
 
-# === Connect to Supabase ===
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-# === Helper: Extract landmarks from image ===
-def extract_landmarks(image):
-    mp_hands = mp.solutions.hands
-    with mp_hands.Hands(static_image_mode=True) as hands:
-        results = hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        if results.multi_hand_landmarks:
-            landmarks = results.multi_hand_landmarks[0]
-            return np.array([[lm.x, lm.y, lm.z] for lm in landmarks.landmark]).flatten()
-    return None
+def write_report(report):
+    os.makedirs(os.path.dirname(PROMOTION_REPORT) or ".", exist_ok=True)
+    with open(PROMOTION_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Promotion report written to {PROMOTION_REPORT}")
 
-# === Load preprocessed original dataset ===
-if not os.path.exists(BASE_DATASET_FILE):
+
+# === Feedback source: Supabase, or a local directory standing in for it ===
+if FEEDBACK_LOCAL_DIR:
+    source = LocalFeedbackSource(FEEDBACK_LOCAL_DIR)
+else:
+    from supabase import create_client
+    SUPABASE_URL = os.environ["SUPABASE_URL"]
+    SUPABASE_KEY = os.environ["SUPABASE_SERVICE_KEY"]
+    source = SupabaseFeedbackSource(create_client(SUPABASE_URL, SUPABASE_KEY), BUCKET_NAME)
+
+# === Open the landmark store (seeded from the preprocessed dataset on first use) ===
+dataset = open_dataset(LANDMARK_STORE_DIR, BASE_DATASET_FILE)
+if len(dataset) == 0:
     raise FileNotFoundError(f"❌ Base dataset file not found: {BASE_DATASET_FILE}")
 
-print(f"📂 Loading base dataset from {BASE_DATASET_FILE}...")
-data = np.load(BASE_DATASET_FILE)
-X, y = data["X"].tolist(), data["y"].tolist()
+print(f"✅ Landmark store has {len(dataset)} samples")
 
-print(f"✅ Loaded base dataset with {len(X)} samples")
+# === Append new feedback to the store ===
+store = FeedbackStore(dataset, FEEDBACK_STORE_DIR)
+print(f"📡 Fetching feedback newer than {store.high_water_mark or 'the beginning'}...")
+added = store.sync(source, max_rows=MAX_FEEDBACK_ROWS)
+print(f"✅ {added} new feedback samples ({len(store)} feedback samples in total)")
 
-# === Load feedback from Supabase ===
-print("📡 Fetching feedback records from Supabase...")
-feedback_rows = supabase.table("feedback").select("*").execute().data
+X, y = dataset.arrays()
+print(f"📊 Total samples after adding feedback: {len(X)}")
+X_hold, y_hold, holdout_info = load_holdout(dataset)
+print(f"🎯 Fixed holdout v{holdout_info['version']}: {holdout_info['rows']} samples")
 
-for row in feedback_rows:
-    correct_label = row.get("correct_label")
-    image_filename = row.get("image_filename")
-    if not correct_label or not image_filename:
-        continue
+# === Current model: the starting point for an incremental update ===
+base, base_info = None, {}
+if RETRAIN_MODE == "incremental":
+    import joblib
+    try:
+        base_path, base_info = resolve_current()
+        base = joblib.load(base_path)
+    except FileNotFoundError:
+        pass
+    if not isinstance(base, RandomForestClassifier) or schema_for(base) != FEATURE_SCHEMA:
+        print("ℹ️  No compatible random forest to update; doing a full fit instead")
+        base = None
+    elif base_info.get("store_rows") is None:
+        # Trained outside the store (n_samples counts something else): no row offset to continue from
+        print("ℹ️  Current model does not record how many store rows it saw; doing a full fit instead")
+        base = None
 
-    print(f"⬇️  Downloading feedback image: {image_filename}")
-    res = supabase.storage.from_(BUCKET_NAME).download(image_filename)
-    if res:
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(res)
-            tmp_path = tmp.name
-        image = cv2.imread(tmp_path)
-        features = extract_landmarks(image)
-        if features is not None:
-            X.append(features)
-            y.append(int(correct_label))
+start = time.perf_counter()
+if base is not None:
+    trained_rows = base_info["store_rows"]
+    if trained_rows >= len(X):
+        print(f"✅ No new samples since version {base_info.get('version')}; nothing to retrain")
+        write_report({"promoted": False, "reason": "no new samples", "current_version": base_info.get("version")})
+        raise SystemExit(0)
+    print(f"🌲 Growing version {base_info.get('version')} on samples {trained_rows}+...")
+    clf, report = update_forest(base, X, y, FEATURE_SCHEMA, trained_rows, seed=len(X), augment_copies=AUGMENT_COPIES)
+    print(f"   +{report['new_trees']} trees on {report['recent_rows']} new + {report['replay_rows']} replayed samples,"
+          f" retired {report['retired_trees']}, {report['n_trees']} trees in generation {report['generation']}")
+    accuracy = report["holdout_accuracy"]
+    extra = {"mode": "incremental", "base_version": base_info.get("version"), **report}
+else:
+    print("🤖 Training a fresh model on every sample...")
+    train_idx, holdout_idx = split_holdout(len(X))
+    X_fit, y_fit = augment_dataset(X[train_idx], y[train_idx], AUGMENT_COPIES, seed=len(X))
+    clf = RandomForestClassifier(n_jobs=-1)
+    clf.fit(build_features(X_fit, FEATURE_SCHEMA), y_fit)
+    # Held-out, not OOB: with augmentation a sample's copies can be in-bag when it is not
+    accuracy = float(np.mean(clf.predict(build_features(X[holdout_idx], FEATURE_SCHEMA)) == y[holdout_idx]))
+    extra = {"mode": "full", "holdout_rows": int(len(holdout_idx)),
+             "augmented_rows": int(len(y_fit) - len(train_idx))}
+print(f"⏱️  Trained in {time.perf_counter() - start:.1f} s")
 
-print(f"📊 Total samples after adding feedback: {len(X)}")
+# === Gate: score candidate and current model on the fixed holdout ===
+current, current_info = None, {}
+try:
+    from forest_export import load_classifier
+    current_path, current_info = resolve_current()
+    current = load_classifier(current_path)
+except FileNotFoundError:
+    print("ℹ️  No current model; the candidate is promoted without comparison")
 
-# === Train new model ===
-print("🤖 Training new feedback model...")
-clf = RandomForestClassifier()
-clf.fit(X, y)
+report = promotion_report(clf, current, X_hold, y_hold, holdout_info)
+report["current_version"] = current_info.get("version")
+candidate, baseline = report["candidate"], report["current"]
+if baseline is not None:
+    print(f"📏 Holdout accuracy {baseline['accuracy']:.3f} -> {candidate['accuracy']:.3f},"
+          f" latency {baseline['latency_us']:.0f} -> {candidate['latency_us']:.0f} µs per frame")
+if not report["promoted"]:
+    for problem in report["problems"]:
+        print(f"❌ Regression: {problem}")
+    print("🛑 Candidate rejected; the current model stays live")
+    write_report(report)
+    raise SystemExit(0)
 
-os.makedirs("model", exist_ok=True)
-joblib.dump(clf, MODEL_OUTPUT)
-print(f"✅ New feedback model saved at {MODEL_OUTPUT}")
\ No newline at end of file
+info = publish_model(
+    clf,
+    n_samples=len(X),
+    store_rows=len(X),
+    n_feedback_samples=len(store),
+    accuracy=round(accuracy, 4),
+    fixed_holdout_accuracy=round(candidate["accuracy"], 4),
+    holdout_version=holdout_info["version"],
+    latency_us=round(candidate["latency_us"], 1),
+    trained_by="retrain_with_feedback.py",
+    **extra,
+)
+report["version"] = info["version"]
+write_report(report)
+print(f"✅ New feedback model published as version {info['version']} (holdout accuracy {info['accuracy']:.3f})")
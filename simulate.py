@@ -0,0 +1,167 @@
+"""Batch hand cricket simulator: millions of bot-vs-policy matches in NumPy.
+
+Every match in the batch plays the rules of ``game_engine.Match``. Each step
+plays one ball of every match that is still going, so the cost is one set of
+array operations per ball instead of per match.
+
+A policy picks numbers for many matches at once:
+
+    policy.reset(n_matches)                       # before the first ball
+    policy.choose(rng, idx, batting) -> int array # numbers 1-10 for matches idx
+    policy.observe(idx, opponent_nums)            # what the other side showed
+
+``idx`` holds the indices of the matches still in play, so a policy that
+keeps per-match state can index it directly.
+
+    python simulate.py --matches 1000000 --bot fixed:1 --player uniform
+"""
+import argparse
+import time
+
+import numpy as np
+
+WIN, LOSE, TIE, UNFINISHED = 1, -1, 0, 2
+MAX_NUM = 10
+
+
+class UniformPolicy:
+    def reset(self, n_matches):
+        pass
+
+    def choose(self, rng, idx, batting):
+        return rng.integers(1, MAX_NUM + 1, size=len(idx))
+
+    def observe(self, idx, opponent_nums):
+        pass
+
+
+class FixedPolicy(UniformPolicy):
+    """Always shows the same number (the live bot currently always shows 1)."""
+
+    def __init__(self, num):
+        self.num = num
+
+    def choose(self, rng, idx, batting):
+        return np.full(len(idx), self.num)
+
+
+class WeightedPolicy(UniformPolicy):
+    """Draws from a fixed distribution over 1-10 (e.g. a player's measured habits)."""
+
+    def __init__(self, probs):
+        probs = np.asarray(probs, dtype=np.float64)
+        self.cdf = np.cumsum(probs / probs.sum())
+
+    def choose(self, rng, idx, batting):
+        return np.searchsorted(self.cdf, rng.random(len(idx)), side="right").clip(0, MAX_NUM - 1) + 1
+
+
+def _innings(rng, player, bot, player_bats, active, balls, max_balls, on_ball):
+    """Play one innings for the matches in ``active``; returns those still batting after ``max_balls``."""
+    for _ in range(max_balls):
+        if active.size == 0:
+            break
+        p = player.choose(rng, active, player_bats)
+        b = bot.choose(rng, active, not player_bats)
+        player.observe(active, b)
+        bot.observe(active, p)
+        balls[active] += 1
+        active = on_ball(active, p == b, p if player_bats else b)
+    return active
+
+
+def simulate(n_matches, bot, player, seed=0, max_balls=500):
+    """Play ``n_matches`` full matches; returns per-match arrays and a summary."""
+    rng = np.random.default_rng(seed)
+    bot.reset(n_matches)
+    player.reset(n_matches)
+    player_score = np.zeros(n_matches, dtype=np.int64)
+    bot_score = np.zeros(n_matches, dtype=np.int64)
+    balls = np.zeros(n_matches, dtype=np.int64)
+    result = np.full(n_matches, UNFINISHED, dtype=np.int8)
+
+    # Player bats: add runs until out
+    def player_ball(active, out, scored):
+        keep = ~out
+        player_score[active[keep]] += scored[keep]
+        return active[keep]
+
+    all_matches = np.arange(n_matches)
+    capped = _innings(rng, player, bot, True, all_matches, balls, max_balls, player_ball)
+
+    # Bot chases: tie/win when bowled out, lose as soon as it passes the player's score
+    def bot_ball(active, out, scored):
+        done = active[out]
+        result[done] = np.where(player_score[done] == bot_score[done], TIE, WIN)
+        cont = active[~out]
+        bot_score[cont] += scored[~out]
+        passed = player_score[cont] < bot_score[cont]
+        result[cont[passed]] = LOSE
+        return cont[~passed]
+
+    # Matches whose first innings never ended (e.g. two fixed, different numbers) stay unfinished
+    chasing = np.setdiff1d(all_matches, capped, assume_unique=True)
+    _innings(rng, player, bot, False, chasing, balls, max_balls, bot_ball)
+
+    return {
+        "player_score": player_score,
+        "bot_score": bot_score,
+        "balls": balls,
+        "result": result,
+        "summary": summarize(player_score, bot_score, balls, result),
+    }
+
+
+def summarize(player_score, bot_score, balls, result):
+    n = len(result)
+    pct = lambda a: {p: int(v) for p, v in zip((5, 50, 95), np.percentile(a, [5, 50, 95]))}
+    return {
+        "matches": n,
+        "win_rate": float(np.mean(result == WIN)),
+        "lose_rate": float(np.mean(result == LOSE)),
+        "tie_rate": float(np.mean(result == TIE)),
+        "unfinished_rate": float(np.mean(result == UNFINISHED)),
+        "player_score_mean": float(player_score.mean()),
+        "player_score_pct": pct(player_score),
+        "bot_score_mean": float(bot_score.mean()),
+        "balls_mean": float(balls.mean()),
+    }
+
+
+def make_policy(spec):
+    """``uniform`` | ``fixed:<n>`` | ``weighted:<p1>,...,<p10>`` | ``adaptive``"""
+    name, _, arg = spec.partition(":")
+    if name == "uniform":
+        return UniformPolicy()
+    if name == "adaptive":
+        # Keeps an (11, 10) table per match: use batches of ~100k matches or fewer
+        from bot_policy import AdaptivePolicy
+        return AdaptivePolicy()
+    if name == "fixed":
+        return FixedPolicy(int(arg))
+    if name == "weighted":
+        return WeightedPolicy([float(v) for v in arg.split(",")])
+    raise ValueError(f"Unknown policy: {spec}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--bot", default="uniform", help="bot policy (see make_policy)")
+    parser.add_argument("--player", default="uniform", help="player policy (see make_policy)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = simulate(args.matches, make_policy(args.bot), make_policy(args.player), args.seed)["summary"]
+    elapsed = time.perf_counter() - start
+
+    print(f"🏏 {summary['matches']:,} matches, bot={args.bot} vs player={args.player} in {elapsed:.2f} s")
+    print(f"   player win {summary['win_rate']:.2%} · lose {summary['lose_rate']:.2%} · tie {summary['tie_rate']:.2%}"
+          f" · unfinished {summary['unfinished_rate']:.2%}")
+    print(f"   player score mean {summary['player_score_mean']:.1f} (p5/p50/p95 {summary['player_score_pct']})")
+    print(f"   bot score mean {summary['bot_score_mean']:.1f} · balls per match {summary['balls_mean']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
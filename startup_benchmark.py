@@ -0,0 +1,130 @@
+"""Measure cold-start cost: module import times and each page's first render.
+
+Every measurement runs in a fresh interpreter, like a new container would:
+
+* import time of each heavy dependency on its own, and
+* for each page, the time to import Streamlit and then to run the script
+  once through ``streamlit.testing.v1.AppTest`` (the first paint), plus
+  which heavy modules that first run pulled in.
+
+Warm-up is disabled (``HANDCRICKET_PREWARM=0``) so the first render is
+measured on its own. The feedback page runs against a temporary local
+feedback directory instead of Supabase.
+
+    python startup_benchmark.py
+    python startup_benchmark.py --repeat 5 --output bench/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ["numpy", "cv2", "PIL", "joblib", "sklearn", "mediapipe", "supabase",
+                 "streamlit", "streamlit_webrtc", "av"]
+PAGES = ["app.py", "pages/feedback.py"]
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_RENDER_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file({page!r}, default_timeout=120)
+at.secrets["supabase_url"] = "http://localhost"
+at.secrets["supabase_key"] = "benchmark"
+at.run()
+done = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import_s": imported - start,
+    "first_render_s": done - imported,
+    "exceptions": [str(e.value) for e in at.exception],
+    "heavy_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _python(code, env=None):
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, timeout=600)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed")
+    return out.stdout.strip().splitlines()[-1]
+
+
+def import_times(modules=HEAVY_MODULES, repeat=3):
+    """Median cold import time per module in seconds (None if it is not installed)."""
+    times = {}
+    for module in modules:
+        try:
+            runs = [float(_python(_IMPORT_SNIPPET.format(module=module))) for _ in range(repeat)]
+            times[module] = statistics.median(runs)
+        except RuntimeError:
+            times[module] = None
+    return times
+
+
+def first_render(page, repeat=3):
+    """Median first-render figures for one page, or ``{"error": ...}`` if it cannot run here."""
+    env = dict(os.environ, HANDCRICKET_PREWARM="0", FEEDBACK_LOCAL_DIR=tempfile.mkdtemp(prefix="feedback-"))
+    runs = []
+    for _ in range(repeat):
+        try:
+            runs.append(json.loads(_python(_RENDER_SNIPPET.format(page=page, heavy=HEAVY_MODULES), env)))
+        except RuntimeError as e:
+            return {"error": str(e)}
+    return {
+        "streamlit_import_s": statistics.median(r["streamlit_import_s"] for r in runs),
+        "first_render_s": statistics.median(r["first_render_s"] for r in runs),
+        "exceptions": runs[-1]["exceptions"],
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+    }
+
+
+def print_report(result):
+    print("📦 Cold import time per module")
+    for module, t in result["imports"].items():
+        print(f"   {module:<17} {'not installed' if t is None else f'{t * 1000:8.0f} ms'}")
+    for page, r in result["pages"].items():
+        if "error" in r:
+            print(f"⚠️  {page}: could not render ({r['error']})")
+            continue
+        print(f"🖥️  {page}: streamlit import {r['streamlit_import_s'] * 1000:.0f} ms,"
+              f" first render {r['first_render_s'] * 1000:.0f} ms")
+        print(f"   heavy modules loaded by the first render: {', '.join(r['heavy_loaded']) or 'none'}")
+        for e in r["exceptions"]:
+            print(f"   ❌ {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (median is reported)")
+    parser.add_argument("--pages", nargs="*", default=PAGES)
+    parser.add_argument("--output", help="write the result JSON here")
+    args = parser.parse_args(argv)
+
+    result = {
+        "imports": import_times(repeat=args.repeat),
+        "pages": {page: first_render(page, args.repeat) for page in args.pages},
+    }
+    print_report(result)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Result written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
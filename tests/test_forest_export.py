@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_export import FlatForest, export_forest
+
+
+@pytest.fixture(scope="module")
+def forest(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 12)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int) + 2 * (X[:, 3] > 0.5)
+    clf = RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+    path = tmp_path_factory.mktemp("model") / "forest.npz"
+    export_forest(clf, path)
+    X_test = rng.normal(size=(200, 12)).astype(np.float32)
+    return clf, FlatForest.load(path), np.concatenate([X, X_test])
+
+
+def test_predict_proba_matches_sklearn(forest):
+    clf, flat, X = forest
+    np.testing.assert_allclose(flat.predict_proba(X), clf.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(flat.predict(X), clf.predict(X))
+
+
+def test_single_rows_match_batch(forest):
+    clf, flat, X = forest
+    single = np.concatenate([flat.predict_proba(row) for row in X])
+    np.testing.assert_allclose(single, clf.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_samples_on_a_threshold(forest):
+    # Features exactly at (and one float32 step around) split thresholds, where a
+    # float32 compare would differ from sklearn's float64 one if rounded the wrong way
+    clf, flat, X = forest
+    internal = clf.estimators_[0].tree_.feature >= 0
+    feats = clf.estimators_[0].tree_.feature[internal]
+    thresholds = clf.estimators_[0].tree_.threshold[internal].astype(np.float32)
+    rows = np.repeat(X[:1], 3 * len(feats), axis=0)
+    for i, (feat, t) in enumerate(zip(feats, thresholds)):
+        rows[3 * i:3 * i + 3, feat] = [np.nextafter(t, -np.inf), t, np.nextafter(t, np.inf)]
+    np.testing.assert_allclose(flat.predict_proba(rows), clf.predict_proba(rows), rtol=0, atol=1e-12)
+    single = np.concatenate([flat.predict_proba(row) for row in rows])
+    np.testing.assert_allclose(single, clf.predict_proba(rows), rtol=0, atol=1e-12)
@@ -1,33 +1,30 @@
-import mediapipe as mp
-import cv2
-import os
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-import joblib
+from augment import augment_dataset
+from features import build_features
+from forest_update import split_holdout
+from landmark_extraction import append_images
+from landmark_store import BASE_DATASET_FILE, LANDMARK_STORE_DIR, open_dataset
+from model_registry import publish_model
 
-def extract_landmarks(image):
-    mp_hands = mp.solutions.hands
-    with mp_hands.Hands(static_image_mode=True) as hands:
-        results = hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        if results.multi_hand_landmarks:
-            landmarks = results.multi_hand_landmarks[0]
-            return np.array([[lm.x, lm.y, lm.z] for lm in landmarks.landmark]).flatten()
-    return None
+FEATURE_SCHEMA = "normalized"  # or "raw" for image-relative landmarks
+AUGMENT_COPIES = 2  # augmented copies of each sample (see augment.py); 0 to turn off
 
-X, y = [], []
+if __name__ == "__main__":
+    # Train from the landmark store, after appending any newly collected images to it
+    dataset = open_dataset(LANDMARK_STORE_DIR, BASE_DATASET_FILE)
+    added = append_images(dataset, "dataset")
+    print(f"✅ {added} new images appended; landmark store has {len(dataset)} samples")
+    X, y = dataset.arrays()
+    # Holdout rows are what evaluation's promotion gate scores models on: never train on them
+    train_idx, holdout_idx = split_holdout(len(X))
 
-for label in os.listdir("dataset"):
-    for img_file in os.listdir(f"dataset/{label}"):
-        path = f"dataset/{label}/{img_file}"
-        image = cv2.imread(path)
-        features = extract_landmarks(image)
-        if features is not None:
-            X.append(features)
-            y.append(int(label))
+    clf = RandomForestClassifier(n_jobs=-1)
+    X_fit, y_fit = augment_dataset(X[train_idx], y[train_idx], AUGMENT_COPIES, seed=0)
+    clf.fit(build_features(X_fit, FEATURE_SCHEMA), y_fit)
+    # Held-out, not OOB: with augmentation a sample's copies can be in-bag when it is not
+    accuracy = float(np.mean(clf.predict(build_features(X[holdout_idx], FEATURE_SCHEMA)) == y[holdout_idx]))
 
-clf = RandomForestClassifier()
-clf.fit(X, y)
-
-os.makedirs("model", exist_ok=True)
-joblib.dump(clf, "model/hand_cricket1.pkl")
-print("Model trained and saved.")
\ No newline at end of file
+    info = publish_model(clf, n_samples=len(X), store_rows=len(X), accuracy=round(accuracy, 4),
+                         augment_copies=AUGMENT_COPIES, trained_by="train_model.py")
+    print(f"Model trained and saved as version {info['version']} (holdout accuracy {info['accuracy']:.3f}).")
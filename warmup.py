@@ -0,0 +1,50 @@
+"""Build heavy process-wide resources in the background, after the first render.
+
+The pages only create the model, the inference pool and the assets when
+something needs them (a game starts, a stream opens). ``warm_up`` is called
+at the end of a page's first run, once its widgets have gone out: it builds
+the cheap singletons (model, assets, upload queue) on a daemon thread, so the
+first click usually finds them ready without having held up first paint. Set
+``HANDCRICKET_PREWARM=0`` to turn it off (e.g. when measuring cold paths with
+``startup_benchmark.py``).
+
+The inference pool is left out by default: it starts a MediaPipe process per
+core, which a page view that never starts a game should not pay for. Set
+``HANDCRICKET_PREWARM_INFERENCE=1`` to prewarm it too (e.g. on a dedicated
+server where the first game should not wait for it).
+"""
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("HANDCRICKET_PREWARM", "1") != "0"
+INFERENCE = os.environ.get("HANDCRICKET_PREWARM_INFERENCE", "0") == "1"
+
+_started = set()
+_lock = threading.Lock()
+timings = {}
+
+
+def warm_up(name, **steps):
+    """Run the callables in ``steps`` once per process on a background thread, in order.
+
+    How long each took (seconds) ends up in ``timings`` under ``<name>.<step>``.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        if name in _started:
+            return
+        _started.add(name)
+
+    def run():
+        for step, build in steps.items():
+            start = time.perf_counter()
+            try:
+                build()
+            except Exception as e:
+                # The page builds it again on demand and reports the error there
+                print(f"⚠️  Warm-up of {name}.{step} failed: {e}")
+            timings[f"{name}.{step}"] = time.perf_counter() - start
+
+    threading.Thread(target=run, name=f"warm-up-{name}", daemon=True).start()